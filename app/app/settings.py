@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'graphene_django',
@@ -77,6 +78,16 @@ GRAPHENE = {
     'SCHEMA': 'app.schema.schema'
 }
 
+# Number of parsed and validated GraphQL documents kept per process
+GRAPHQL_DOCUMENT_CACHE_SIZE = 1000
+
+# Budget a GraphQL query must fit in before it is executed. Lists without a
+# `first` argument are assumed to return GRAPHQL_DEFAULT_LIST_SIZE items.
+# Introspection fields cost a fixed amount each and are left out of depth.
+GRAPHQL_MAX_QUERY_COST = 10000
+GRAPHQL_MAX_QUERY_DEPTH = 10
+GRAPHQL_DEFAULT_LIST_SIZE = 20
+
 WSGI_APPLICATION = 'app.wsgi.application'
 
 
@@ -94,6 +105,86 @@ DATABASES = {
 }
 
 
+# The cache must be shared between processes, e.g. memcached, for cached
+# traveler responses and token lookups to be invalidated everywhere on
+# writes. With a local memory cache, the default, traveler responses,
+# statistics and indexes are not cached and token lookups always hit the
+# database, unless CACHE_SINGLE_PROCESS declares that the app runs in a
+# single process, like the development server or the test runner.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+CACHE_SINGLE_PROCESS = bool(int(os.environ.get('CACHE_SINGLE_PROCESS', 0)))
+
+# Cache alias and timeout of the traveler list responses
+TRAVELER_CACHE_ALIAS = 'default'
+TRAVELER_CACHE_TIMEOUT = 300
+
+# Spots are searched with the PostgreSQL text search configuration below
+# and pg_trgm. Other databases use an in-memory index, matching words whose
+# trigram similarity is at least TRAVELER_SEARCH_SIMILARITY, and only the
+# best TRAVELER_SEARCH_MAX_RESULTS spots are returned so the ranks fit in
+# the query parameters SQLite allows.
+TRAVELER_SEARCH_CONFIG = 'english'
+TRAVELER_SEARCH_SIMILARITY = 0.3
+TRAVELER_SEARCH_MAX_RESULTS = 250
+
+# Tag and location names are autocompleted from per process prefix indexes
+# of up to TRAVELER_AUTOCOMPLETE_USERS users, rebuilt after writes
+TRAVELER_AUTOCOMPLETE_USERS = 1000
+TRAVELER_AUTOCOMPLETE_TTL = 600
+
+
+# Token authentication lookups are cached per process for TTL seconds.
+# Entries are validated against the cache alias on every request, so it
+# must be shared between processes for evictions to reach all of them.
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 300
+TOKEN_AUTH_CACHE_ALIAS = 'default'
+
+
+# Uploaded spot images are verified, stripped of metadata and resized by a
+# pool of SPOT_IMAGE_WORKERS threads per process, 0 processes them inline.
+# Tasks lost on a restart are run by the process_pending_images command.
+# Variants are named by the longest side in pixels they are resized to.
+SPOT_IMAGE_WORKERS = int(os.environ.get('SPOT_IMAGE_WORKERS', 2))
+SPOT_IMAGE_VARIANTS = {
+    'thumbnail': 200,
+    'medium': 800,
+}
+
+# Spot image uploads are streamed to disk and rejected while being read
+# when they are not images or exceed these limits
+FILE_UPLOAD_PERMISSIONS = 0o644
+SPOT_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+SPOT_IMAGE_MAX_PIXELS = 40000000
+
+
+# Password hashing. The first hasher hashes new passwords; hashes made by
+# the others, or with other costs, are upgraded on the next login.
+PASSWORD_HASHERS = [
+    'core.hashers.PooledArgon2PasswordHasher',
+    'core.hashers.PooledPBKDF2PasswordHasher',
+]
+PASSWORD_ARGON2_COSTS = {
+    'time_cost': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+    'memory_cost': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST', 512)),
+    'parallelism': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 2)),
+}
+
+# Key derivations run in a bounded pool per process; requests that find
+# PASSWORD_HASHING_MAX_PENDING others queued wait TIMEOUT seconds at most
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_MAX_PENDING = 16
+PASSWORD_HASHING_TIMEOUT = 5
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -136,4 +227,15 @@ STATIC_URL = '/static/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Media is served by core.views.serve_media. MEDIA_SERVE_MODE 'django'
+# streams files from the app, which WSGI servers with a file wrapper send
+# with sendfile(). 'x-accel-redirect' hands the file to nginx through the
+# internal location MEDIA_ACCEL_PREFIX, 'x-sendfile' to Apache or lighttpd.
+# Content addressed names never change and are cached for a year. Files
+# under MEDIA_PRIVATE_DIR, such as storage leases, are never served.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 3600
+MEDIA_PRIVATE_DIR = 'private'
+
 AUTH_USER_MODEL = 'core.User'
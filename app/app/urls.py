@@ -15,17 +15,19 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
-from graphene_django.views import GraphQLView
-from traveler import schema
-from traveler.views import DRFAuthenticatedGraphQLView
+from app.schema import schema
+from core.views import serve_media
+from traveler.views import DRFAuthenticatedGraphQLView, \
+    PersistedQueryGraphQLView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/traveler/', include('traveler.urls')),
-    path('publicgraphql/', GraphQLView.as_view(graphiql=True)),
+    path('publicgraphql/', PersistedQueryGraphQLView.as_view(graphiql=True)),
     path('graphql/', DRFAuthenticatedGraphQLView.as_view(graphiql=True,
-         schema=schema))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+         schema=schema)),
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', serve_media,
+         name='media'),
+]
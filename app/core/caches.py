@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache(alias):
+    """Return whether a cache alias is seen by every process of the app
+
+    A local memory cache is per process, so invalidations written to it
+    never reach the other workers. It only counts as shared when
+    CACHE_SINGLE_PROCESS declares the app runs in a single process.
+    """
+    return settings.CACHE_SINGLE_PROCESS or \
+        not isinstance(caches[alias], LocMemCache)
@@ -0,0 +1,29 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def get_validators(key, updated_at):
+    """Return the ETag and Last-Modified timestamp of a representation"""
+    digest = hashlib.md5(f'{key}:{updated_at.isoformat()}'.encode())
+
+    return f'"{digest.hexdigest()}"', int(updated_at.timestamp())
+
+
+def conditional_response(request, key, updated_at, get_response):
+    """Return a 304 if the client's copy is current, else get_response()
+
+    Either way the response carries the ETag and Last-Modified headers, so
+    unchanged objects skip both serialization and the payload.
+    """
+    etag, last_modified = get_validators(key, updated_at)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = get_response()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+
+    return response
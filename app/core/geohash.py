@@ -0,0 +1,98 @@
+import math
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Characters of the geohashes stored on located objects, about 5 meters
+PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """Return the geohash of a point"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (
+            (lng_range, longitude) if even else (lat_range, latitude)
+        )
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the height and width in degrees of the cells of a precision"""
+    bits = 5 * precision
+    lat_bits = bits // 2
+    lng_bits = bits - lat_bits
+
+    return 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+
+
+def cover(latitude, longitude, radius):
+    """Return geohash prefixes of cells covering a circle, None for all
+
+    The prefixes are those of the cell holding the center and its eight
+    neighbours, at the finest precision whose cells are at least radius
+    kilometers high and wide, so the circle cannot reach past them.
+    """
+    # A degree of longitude is shortest at the edge nearest a pole
+    farthest = min(90.0, abs(latitude) + radius / KM_PER_DEGREE)
+    scale = math.cos(math.radians(farthest))
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if height * KM_PER_DEGREE >= radius and \
+                width * KM_PER_DEGREE * scale >= radius:
+            break
+    else:
+        return None
+
+    prefixes = set()
+    for lat_step in (-1, 0, 1):
+        lat = latitude + lat_step * height
+        if not -90 <= lat <= 90:
+            continue
+        for lng_step in (-1, 0, 1):
+            lng = (longitude + lng_step * width + 180) % 360 - 180
+            prefixes.add(encode(lat, lng, precision))
+
+    return sorted(prefixes)
+
+
+def haversine(latitude, longitude, latitudes, longitudes):
+    """Return the distances in kilometers from a point to many points
+
+    The points are given as parallel sequences of coordinates and their
+    distances computed in one pass.
+    """
+    lat1 = math.radians(latitude)
+    lng1 = math.radians(longitude)
+    cos_lat1 = math.cos(lat1)
+    sin, cos, asin, sqrt, radians = \
+        math.sin, math.cos, math.asin, math.sqrt, math.radians
+
+    return [
+        2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(
+            sin((radians(lat2) - lat1) / 2) ** 2 +
+            cos_lat1 * cos(radians(lat2)) *
+            sin((radians(lng2) - lng1) / 2) ** 2
+        )))
+        for lat2, lng2 in zip(latitudes, longitudes)
+    ]
@@ -0,0 +1,89 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from core.pools import LazyThreadPool
+
+
+class HashingPoolBusy(Exception):
+    """Raised when no slot frees up in the hashing pool in time"""
+
+
+class HashingPool(LazyThreadPool):
+    """Bounded thread pool running key derivations off the request thread
+
+    At most `workers` hashes run at once and at most `max_pending` wait for
+    a worker. Callers beyond that wait up to `timeout` seconds for a slot,
+    then get HashingPoolBusy instead of piling onto the CPU. Calls made
+    from a pool thread, like a verify that encodes, run inline.
+    """
+
+    thread_name_prefix = 'password-hashing'
+
+    def __init__(self, workers, max_pending, timeout):
+        super().__init__(workers)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._local = threading.local()
+
+    def run(self, fn, *args):
+        """Run fn in the pool and return its result"""
+        if getattr(self._local, 'active', False):
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingPoolBusy('Password hashing pool is saturated')
+        try:
+            return self.executor.submit(self._call, fn, args).result()
+        finally:
+            self._slots.release()
+
+    def _call(self, fn, args):
+        self._local.active = True
+        try:
+            return fn(*args)
+        finally:
+            self._local.active = False
+
+
+hashing_pool = HashingPool(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+    timeout=settings.PASSWORD_HASHING_TIMEOUT
+)
+
+
+class PooledHasherMixin:
+    """Run the encode and verify steps of a hasher in the hashing pool"""
+
+    def encode(self, password, salt, *args):
+        return hashing_pool.run(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return hashing_pool.run(super().verify, password, encoded)
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin,
+                                 hashers.Argon2PasswordHasher):
+    """Argon2 hasher with the costs from PASSWORD_ARGON2_COSTS
+
+    Changing the costs makes must_update true for existing hashes, so they
+    are transparently rehashed on the next successful login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_COSTS['time_cost']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_COSTS['memory_cost']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_COSTS['parallelism']
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin,
+                                 hashers.PBKDF2PasswordHasher):
+    """PBKDF2 hasher, kept to verify and upgrade existing hashes"""
@@ -0,0 +1,100 @@
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Spot
+
+from traveler.filters import filter_assigned
+
+
+class Command(BaseCommand):
+    """Django command to compare the assigned_only filtering strategies"""
+    help = 'Benchmark DISTINCT join against EXISTS for assigned_only tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+',
+            default=[10000, 100000, 1000000],
+            help='Number of spot/tag through table rows to benchmark'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=1000,
+            help='Number of tags the through rows are spread over'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Number of timed runs per query, the best is reported'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('tags', 'repeat'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1')
+        if min(options['sizes']) < 1:
+            raise CommandError('--sizes must be at least 1')
+
+        for size in options['sizes']:
+            # Seed inside a transaction that is always rolled back
+            with transaction.atomic():
+                user = self.seed(size, options['tags'])
+                queryset = Tag.objects.filter(user=user).order_by('-name')
+                distinct = queryset.filter(spot__isnull=False).distinct()
+                exists = filter_assigned(queryset, 'tags')
+
+                distinct_time = self.best_time(distinct, options['repeat'])
+                exists_time = self.best_time(exists, options['repeat'])
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                f'{size} rows: distinct {distinct_time * 1000:.2f}ms, '
+                f'exists {exists_time * 1000:.2f}ms'
+            )
+
+    def seed(self, size, tag_count):
+        """Create a user whose spots hold the given number of tag rows"""
+        user = get_user_model().objects.create_user(
+            'benchmark@localhost', 'benchmark'
+        )
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(tag_count)
+        )
+        tag_ids = list(
+            Tag.objects.filter(user=user).values_list('id', flat=True)
+        )
+        per_spot = min(10, len(tag_ids))
+        Spot.objects.bulk_create(
+            (
+                Spot(user=user, name=f'Spot {i}', time_minutes=10, price=5)
+                for i in range(-(-size // per_spot))
+            )
+        )
+        spot_ids = Spot.objects.filter(user=user).values_list('id', flat=True)
+
+        rows = (
+            Spot.tags.through(
+                spot_id=spot_id,
+                tag_id=tag_ids[(i * per_spot + offset) % len(tag_ids)]
+            )
+            for i, spot_id in enumerate(list(spot_ids))
+            for offset in range(per_spot)
+        )
+        # Insert in batches so the through rows are never all in memory
+        batch = list(islice(rows, 10000))
+        while batch:
+            Spot.tags.through.objects.bulk_create(batch)
+            batch = list(islice(rows, 10000))
+
+        return user
+
+    def best_time(self, queryset, repeat):
+        """Return the fastest of several evaluations of the queryset"""
+        timings = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append(time.perf_counter() - start)
+
+        return min(timings)
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    """Django command to measure logins per second of each password hasher"""
+    help = 'Benchmark login throughput per core for each password hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins', type=int, default=50,
+            help='Number of logins to time per hasher'
+        )
+        parser.add_argument(
+            '--hashers', nargs='+', default=settings.PASSWORD_HASHERS,
+            help='Dotted paths of the hashers to benchmark'
+        )
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        for hasher in options['hashers']:
+            with override_settings(PASSWORD_HASHERS=[hasher]):
+                try:
+                    wall, cpu = self.time_logins(logins)
+                except ValueError as error:
+                    # The algorithm library of the hasher is not installed
+                    self.stdout.write(f'{hasher}: unavailable, {error}')
+                    continue
+
+            self.stdout.write(
+                f'{hasher}: {wall / logins * 1000:.1f}ms per login, '
+                f'{logins / cpu if cpu else float("inf"):.1f} '
+                f'logins per second per core'
+            )
+
+    def time_logins(self, logins):
+        """Return the wall and CPU seconds taken by the logins"""
+        with transaction.atomic():
+            get_user_model().objects.create_user(
+                'benchmark@localhost', 'benchmark'
+            )
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            for i in range(logins):
+                if authenticate(
+                    username='benchmark@localhost', password='benchmark'
+                ) is None:
+                    raise CommandError('Benchmark login failed')
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            transaction.set_rollback(True)
+
+        return wall, cpu
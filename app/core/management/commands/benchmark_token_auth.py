@@ -0,0 +1,47 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from user.authentication import CachedTokenAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    """Django command to compare token authentication with and without cache"""
+    help = 'Benchmark TokenAuthentication against CachedTokenAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=10000,
+            help='Number of authentications to time per backend'
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'benchmark@localhost', 'benchmark'
+            )
+            key = Token.objects.get(user=user).key
+
+            for backend in (TokenAuthentication, CachedTokenAuthentication):
+                token_cache.delete(key)
+                authentication = backend()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    for i in range(count):
+                        authentication.authenticate_credentials(key)
+                    elapsed = time.perf_counter() - start
+
+                self.stdout.write(
+                    f'{backend.__name__}: '
+                    f'{elapsed / count * 1000000:.1f}us per request, '
+                    f'{len(queries)} queries for {count} requests'
+                )
+            token_cache.delete(key)
+            transaction.set_rollback(True)
@@ -0,0 +1,134 @@
+import os
+import time
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Spot, spot_image_file_path, spot_image_storage, \
+    spot_upload_file_path
+from core.storage import file_digest
+
+from traveler.images import variant_names
+
+
+class Command(BaseCommand):
+    """Django command to deduplicate the stored spot images"""
+    help = 'Move spot images to content addressed names and remove ' \
+        'duplicate and unreferenced files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Seconds an unreferenced file must be untouched to be '
+                 'removed, protecting uploads in progress'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be reclaimed without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        self.storage = spot_image_storage
+        self.dry_run = options['dry_run']
+        self.reclaimed = 0
+        # Files moved away so far by the name they moved to, so that a dry
+        # run finds the duplicates and orphans a real run would
+        self.moved = {}
+
+        merged = 0
+        names = Spot.objects.exclude(image='').exclude(image=None).values_list(
+            'image', flat=True
+        ).distinct()
+        for name in list(names):
+            if self.exists(name) and self.deduplicate(name):
+                merged += 1
+
+        removed = self.sweep(options['min_age'])
+        expired = self.storage.expire_leases(self.dry_run)
+
+        self.stdout.write(
+            f'Merged {merged} duplicate images, removed {removed} '
+            f'unreferenced files, reclaimed {self.reclaimed} bytes, '
+            f'expired {expired} leases'
+        )
+
+    def exists(self, name):
+        """Return whether a file exists once the moves so far are done"""
+        if name in self.moved:
+            return False
+
+        return name in self.moved.values() or self.storage.exists(name)
+
+    def deduplicate(self, name):
+        """Move an image to its content name, returning if it was a copy"""
+        with self.storage.open(name) as image_file:
+            digest = file_digest(image_file)
+        if os.path.splitext(os.path.basename(name))[0] == digest:
+            return False
+
+        target = self.storage.content_name(name, digest)
+        duplicate = self.exists(target)
+        self.move(name, target)
+        variants = variant_names(target)
+        for variant, names in variant_names(name).items():
+            for ext, variant_name in names.items():
+                if self.exists(variant_name):
+                    self.move(variant_name, variants[variant][ext])
+
+        if not self.dry_run:
+            Spot.objects.filter(image=name).update(
+                image=target, updated_at=timezone.now()
+            )
+
+        return duplicate
+
+    def move(self, name, target):
+        """Move a file to target, dropping it if target already exists"""
+        if self.exists(target):
+            self.reclaimed += self.storage.size(name)
+            if not self.dry_run:
+                self.storage.delete(name)
+        elif not self.dry_run:
+            path = self.storage.path(target)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.rename(self.storage.path(name), path)
+        self.moved[name] = target
+
+    def sweep(self, min_age):
+        """Remove files old enough that no spot image or variant uses"""
+        referenced = set()
+        for name in Spot.objects.exclude(image='').exclude(
+            image=None
+        ).values_list('image', flat=True).distinct():
+            # A dry run leaves the spots on the names they would move from
+            name = self.moved.get(name, name)
+            referenced.add(name)
+            for names in variant_names(name).values():
+                referenced.update(names.values())
+
+        roots = [
+            self.storage.path(os.path.dirname(path(None, 'upload')))
+            for path in (spot_image_file_path, spot_upload_file_path)
+        ]
+        cutoff = time.time() - min_age
+        removed = 0
+        for directory, _, files in chain.from_iterable(
+            os.walk(root) for root in roots
+        ):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.storage.location)
+                if name in referenced or name in self.moved or \
+                        os.path.getmtime(path) > cutoff:
+                    continue
+                # Leases are checked under the lock saves lease under
+                with self.storage.locked():
+                    if self.storage.is_leased(name):
+                        continue
+                    self.reclaimed += os.path.getsize(path)
+                    removed += 1
+                    if not self.dry_run:
+                        self.storage.delete(name)
+
+        return removed
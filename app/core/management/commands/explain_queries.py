@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from traveler import views
+
+
+ENDPOINTS = (
+    ('tags', views.TagViewSet, {}),
+    ('tags assigned_only', views.TagViewSet, {'assigned_only': 1}),
+    ('locations', views.LocationViewSet, {}),
+    ('locations assigned_only', views.LocationViewSet, {'assigned_only': 1}),
+    ('spots', views.SpotViewSet, {}),
+    ('spots by tags', views.SpotViewSet, {'tags': '1,2'}),
+    ('spots by locations', views.SpotViewSet, {'locations': '1,2'}),
+)
+
+
+class Command(BaseCommand):
+    """Django command to print the query plan of each traveler endpoint"""
+    help = 'Print EXPLAIN ANALYZE output for the traveler list queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'email',
+            help='User whose data the endpoint queries are run against'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['email']} does not exist")
+
+        # ANALYZE runs the query, which only PostgreSQL supports here
+        explain_options = {}
+        if connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        factory = APIRequestFactory()
+        for label, viewset, params in ENDPOINTS:
+            request = Request(factory.get('/', params))
+            request.user = user
+            view = viewset(
+                request=request, action='list', kwargs={}, format_kwarg=None
+            )
+            queryset = view.get_queryset()
+
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Spot
+
+from traveler.images import process_spot_image
+
+
+class Command(BaseCommand):
+    """Django command to process spot images left pending"""
+    help = 'Process the spot images whose task was lost, for example when ' \
+        'the process that accepted the upload restarted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=600,
+            help='Seconds a spot must have been pending to be processed, '
+                 'leaving tasks still queued in running servers alone'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        pending = Spot.objects.filter(
+            image_status=Spot.IMAGE_PENDING, updated_at__lte=cutoff
+        ).exclude(image='').values_list('pk', 'image')
+
+        processed = 0
+        for spot_id, name in list(pending):
+            # Runs inline, the spot is skipped if its image changed since
+            process_spot_image(spot_id, name)
+            processed += 1
+
+        self.stdout.write(f'Processed {processed} pending spot images')
@@ -0,0 +1,35 @@
+# Generated by Django 2.1.15 on 2026-10-16 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['user', 'name'], name='core_locati_user_id_071698_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='spot',
+            index=models.Index(fields=['user', 'id'], name='core_spot_user_id_64df36_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='core_tag_user_id_74e398_idx'),
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_spot_tags_tag_id_spot_id_idx '
+             'ON core_spot_tags (tag_id, spot_id)'],
+            ['DROP INDEX core_spot_tags_tag_id_spot_id_idx'],
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX core_spot_locations_location_id_spot_id_idx '
+             'ON core_spot_locations (location_id, spot_id)'],
+            ['DROP INDEX core_spot_locations_location_id_spot_id_idx'],
+        ),
+    ]
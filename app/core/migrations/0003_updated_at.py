@@ -0,0 +1,23 @@
+# Generated by Django 2.1.15 on 2026-10-16 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_traveler_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spot',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
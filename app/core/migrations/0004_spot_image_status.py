@@ -0,0 +1,18 @@
+# Generated by Django 2.1.15 on 2026-10-16 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spot',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.1.15 on 2026-10-16 20:42
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_spot_image_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='spot',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.spot_image_file_path),
+        ),
+    ]
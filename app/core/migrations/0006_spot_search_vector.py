@@ -0,0 +1,76 @@
+# Generated by Django 2.1.15 on 2026-10-16 20:46
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# The vector is the spot name weighted A and its tag and location names
+# weighted B, the same document traveler.search.spot_vector() builds
+POPULATE_SEARCH_VECTOR = """
+UPDATE core_spot SET search_vector =
+    setweight(to_tsvector('english', coalesce(core_spot.name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_tag.name, ' ') FROM core_tag
+        JOIN core_spot_tags ON core_spot_tags.tag_id = core_tag.id
+        WHERE core_spot_tags.spot_id = core_spot.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(core_location.name, ' ') FROM core_location
+        JOIN core_spot_locations
+            ON core_spot_locations.location_id = core_location.id
+        WHERE core_spot_locations.spot_id = core_spot.id
+    ), '')), 'B')
+"""
+
+CREATE_SEARCH_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX core_spot_search_vector_gin '
+    'ON core_spot USING gin (search_vector)',
+    'CREATE INDEX core_spot_name_trgm '
+    'ON core_spot USING gin (name gin_trgm_ops)',
+    'CREATE INDEX core_tag_name_trgm '
+    'ON core_tag USING gin (name gin_trgm_ops)',
+    'CREATE INDEX core_location_name_trgm '
+    'ON core_location USING gin (name gin_trgm_ops)',
+    POPULATE_SEARCH_VECTOR,
+]
+
+DROP_SEARCH_INDEXES = [
+    'DROP INDEX core_spot_search_vector_gin',
+    'DROP INDEX core_spot_name_trgm',
+    'DROP INDEX core_tag_name_trgm',
+    'DROP INDEX core_location_name_trgm',
+]
+
+
+def run_on_postgresql(statements):
+    """Return a migration function running statements on PostgreSQL only
+
+    Other databases are searched by the Python index of traveler.search.
+    """
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_spot_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spot',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SEARCH_INDEXES),
+            run_on_postgresql(DROP_SEARCH_INDEXES),
+        ),
+    ]
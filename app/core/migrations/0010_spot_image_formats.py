@@ -0,0 +1,44 @@
+# Generated by Django 2.1.15 on 2026-10-16 22:05
+
+import os
+
+from django.db import migrations, models
+
+
+# Extensions variants were stored in before the formats were recorded
+VARIANT_EXTENSIONS = ('jpg', 'png', 'webp')
+
+
+def record_image_formats(apps, schema_editor):
+    """Record the variant formats of processed images, found in storage"""
+    Spot = apps.get_model('core', 'Spot')
+    spots = Spot.objects.filter(image_status='ready').exclude(image='')
+    for spot in spots.only('id', 'image').iterator():
+        storage = spot.image.storage
+        root = os.path.splitext(spot.image.name)[0]
+        image_formats = ','.join(
+            ext for ext in VARIANT_EXTENSIONS
+            if storage.exists(f'{root}_thumbnail.{ext}')
+        )
+        if image_formats:
+            Spot.objects.filter(pk=spot.pk).update(
+                image_formats=image_formats
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_attr_name_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spot',
+            name='image_formats',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.RunPython(
+            record_image_formats, migrations.RunPython.noop
+        ),
+    ]
@@ -1,10 +1,27 @@
 import uuid
 import os
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+
+from core import geohash
+from core.storage import ContentAddressedStorage
+
+
+# Spot images are stored once per distinct content, see core.storage
+spot_image_storage = ContentAddressedStorage()
+
+
+def location_geohash(latitude, longitude):
+    """Return the geohash stored for coordinates, blank without them"""
+    if latitude is None or longitude is None:
+        return ''
+
+    return geohash.encode(latitude, longitude)
 
 
 def spot_image_file_path(instance, filename):
@@ -15,6 +32,20 @@ def spot_image_file_path(instance, filename):
     return os.path.join('uploads/spot/', filename)
 
 
+def spot_upload_file_path(instance, filename):
+    """Generate private file path for an unprocessed spot image upload"""
+    return os.path.join(
+        settings.MEDIA_PRIVATE_DIR, spot_image_file_path(instance, filename)
+    )
+
+
+def spot_image_variant_path(name, variant, ext):
+    """Generate file path for a processed variant of a spot image"""
+    root = os.path.splitext(name)[0]
+
+    return f'{root}_{variant}.{ext}'
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -43,6 +74,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
@@ -57,9 +89,38 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id']),
+        ]
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Deferred images are not loaded just to be remembered
+        if 'image' in instance.__dict__:
+            instance._loaded_image = instance.image.name
+
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Save the spot, noting in `replaced_image` the image it replaced
+
+        The replaced image is read by the post_save handlers, which collect
+        it once nothing uses it.
+        """
+        self.replaced_image = None
+        if 'image' in self.__dict__:
+            loaded = getattr(self, '_loaded_image', None)
+            if loaded and loaded != self.image.name:
+                self.replaced_image = loaded
+        super().save(*args, **kwargs)
+        if 'image' in self.__dict__:
+            self._loaded_image = self.image.name
+
 
 class Location(models.Model):
     """Location to be associated with a spot"""
@@ -68,13 +129,50 @@ class Location(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    latitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Prefix searchable index of the coordinates, see core.geohash
+    geohash = models.CharField(
+        max_length=12, blank=True, db_index=True, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.geohash = location_geohash(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
+
+class SpotManager(models.Manager):
+    """Manager leaving out the search vector, only read by the database"""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
 
 class Spot(models.Model):
     """Spot object, a Yocal-Spot"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -85,7 +183,25 @@ class Spot(models.Model):
     link = models.CharField(max_length=255, blank=True)
     locations = models.ManyToManyField('Location')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=spot_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to=spot_upload_file_path,
+        storage=spot_image_storage, db_index=True
+    )
+    image_status = models.CharField(
+        max_length=10, choices=IMAGE_STATUS_CHOICES, blank=True
+    )
+    # Comma separated extensions the variants of the image are stored in
+    image_formats = models.CharField(max_length=20, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Name, tag and location names, maintained by traveler.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = SpotManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+        ]
 
     def __str__(self):
         return self.name
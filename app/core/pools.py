@@ -0,0 +1,28 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LazyThreadPool:
+    """Base of the process-wide thread pools, starting threads on first use
+
+    Pools are module globals built at import time, which forking servers
+    do before they fork. The executor is created lazily so every process
+    starts its own threads instead of inheriting dead ones.
+    """
+    thread_name_prefix = ''
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix=self.thread_name_prefix
+                )
+
+            return self._executor
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def file_digest(content):
+    """Return the SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+
+    return digest.hexdigest()
+
+
+# Content names, including the variants derived from them
+CONTENT_NAME = re.compile(r'^[0-9a-f]{64}(_\w+)?\.\w+$')
+
+
+def is_content_name(name):
+    """Return whether a stored name is addressed by its content"""
+    return bool(CONTENT_NAME.match(os.path.basename(name)))
+
+
+def is_private_name(name):
+    """Return whether a stored name is kept out of the media URLs"""
+    return name.split('/', 1)[0] == settings.MEDIA_PRIVATE_DIR
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping one file per distinct content
+
+    Files are stored as `<directory>/<aa>/<digest><ext>`, where directory
+    and extension come from the name given to save() and the digest is
+    the SHA-256 of the content. Saving content that is already stored
+    returns the existing name without writing anything. Uploads hashed
+    while they were received carry their digest as a `sha256` attribute
+    and are not read again.
+
+    Content returned that way may not be referenced yet, so it is leased
+    for `lease_seconds` and must not be deleted while is_leased() holds.
+    Leases are taken, and deletions decided, while holding locked(), so a
+    deletion either sees the lease or happens before the save looks for
+    the content and writes it again. Leases are files under
+    MEDIA_PRIVATE_DIR, the content itself is never modified.
+    """
+    lease_seconds = 600
+
+    def content_name(self, name, digest):
+        """Return the name of the content with a digest"""
+        directory, basename = os.path.split(name)
+        ext = os.path.splitext(basename)[1].lower()
+
+        return os.path.join(directory, digest[:2], digest + ext)
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None) or file_digest(content)
+        name = self.content_name(name, digest)
+        with self.locked():
+            token = self.lease(name)
+            if self.exists(name):
+                return name
+
+        # New content is only leased while it is written
+        try:
+            return super()._save(name, content)
+        finally:
+            self.release(name, token)
+
+    def delete(self, name):
+        super().delete(name)
+        try:
+            os.remove(self.lease_path(name))
+        except FileNotFoundError:
+            pass
+
+    def private_path(self, *names):
+        return self.path(os.path.join(settings.MEDIA_PRIVATE_DIR, *names))
+
+    def lease_path(self, name):
+        return self.private_path('leases', name)
+
+    @contextmanager
+    def locked(self):
+        """Hold the lock leases are taken and deletions decided under"""
+        path = self.private_path('leases.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def lease(self, name):
+        """Protect stored content from deletion for lease_seconds
+
+        Returns the token of the lease, for release().
+        """
+        path = self.lease_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        token = uuid.uuid4().hex
+        with open(path, 'w') as lease_file:
+            lease_file.write(token)
+
+        return token
+
+    def release(self, name, token):
+        """Drop a lease unless it was taken again since"""
+        path = self.lease_path(name)
+        with self.locked():
+            try:
+                with open(path) as lease_file:
+                    if lease_file.read() != token:
+                        return
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def is_leased(self, name):
+        """Return whether stored content was leased and may still be used"""
+        try:
+            leased = os.path.getmtime(self.lease_path(name))
+        except FileNotFoundError:
+            return False
+
+        return leased > time.time() - self.lease_seconds
+
+    def expire_leases(self, dry_run=False):
+        """Remove the expired leases, returning how many there were"""
+        root = self.private_path('leases')
+        cutoff = time.time() - self.lease_seconds
+        expired = 0
+        with self.locked():
+            for directory, _, files in os.walk(root):
+                for filename in files:
+                    path = os.path.join(directory, filename)
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                    expired += 1
+                    if not dry_run:
+                        os.remove(path)
+
+        return expired
+
+    def save_derived(self, name, content):
+        """Store a file derived from stored content under its exact name
+
+        A derived file is a function of the content it was made from, so
+        an existing file is kept as is.
+        """
+        if self.exists(name):
+            return name
+
+        return super()._save(name, content)
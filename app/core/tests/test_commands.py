@@ -1,8 +1,14 @@
+import os
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from core.models import Spot
 
 
 class CommandTests(TestCase):
@@ -21,3 +27,140 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_explain_queries(self):
+        """Test printing the query plans of the traveler endpoints"""
+        get_user_model().objects.create_user('test@gmail.com', 'testpass')
+        out = StringIO()
+        call_command('explain_queries', 'test@gmail.com', stdout=out)
+
+        self.assertIn('tags assigned_only', out.getvalue())
+        self.assertIn('spots by locations', out.getvalue())
+
+    def test_explain_queries_unknown_user(self):
+        """Test explaining queries for a missing user fails"""
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', 'missing@gmail.com')
+
+    def test_benchmark_assigned_only(self):
+        """Test benchmarking the assigned_only filtering strategies"""
+        out = StringIO()
+        call_command(
+            'benchmark_assigned_only', sizes=[20], tags=5, repeat=1,
+            stdout=out
+        )
+
+        self.assertIn('20 rows: distinct', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark_assigned_only_invalid_arguments(self):
+        """Test benchmarking rejects sizes, tags or repeats below 1"""
+        for options in ({'tags': 0}, {'sizes': [0]}, {'repeat': 0}):
+            with self.assertRaises(CommandError):
+                call_command('benchmark_assigned_only', **options)
+
+    @override_settings(CACHE_SINGLE_PROCESS=True)
+    def test_benchmark_token_auth(self):
+        """Test benchmarking cached token authentication"""
+        out = StringIO()
+        call_command('benchmark_token_auth', requests=5, stdout=out)
+
+        self.assertIn(
+            'CachedTokenAuthentication', out.getvalue()
+        )
+        self.assertIn('1 queries for 5 requests', out.getvalue())
+
+    def test_benchmark_login(self):
+        """Test benchmarking logins for each password hasher"""
+        out = StringIO()
+        call_command(
+            'benchmark_login', logins=2, stdout=out,
+            hashers=['core.hashers.PooledArgon2PasswordHasher']
+        )
+
+        self.assertIn('logins per second per core', out.getvalue())
+
+    def test_dedupe_media(self):
+        """Test duplicate spot images are merged and orphans removed"""
+        user = get_user_model().objects.create_user(
+            'test@gmail.com', 'testpass'
+        )
+        storage = Spot._meta.get_field('image').storage
+        names = [f'uploads/spot/{name}.jpg'
+                 for name in ('first', 'second', 'orphan')]
+        os.makedirs(storage.path('uploads/spot'), exist_ok=True)
+        for name in names:
+            with open(storage.path(name), 'wb') as image_file:
+                image_file.write(b'same content')
+        spots = [
+            Spot.objects.create(user=user, name=name, time_minutes=5,
+                                price=5.00, image=name)
+            for name in names[:2]
+        ]
+        out = StringIO()
+
+        call_command('dedupe_media', min_age=0, stdout=out)
+
+        spots[0].refresh_from_db()
+        spots[1].refresh_from_db()
+        self.assertEqual(spots[0].image.name, spots[1].image.name)
+        self.assertTrue(storage.exists(spots[0].image.name))
+        for name in names:
+            self.assertFalse(storage.exists(name))
+        self.assertIn('Merged 1 duplicate images, removed 1 unreferenced '
+                      'files, reclaimed 24 bytes', out.getvalue())
+        spots[0].image.delete()
+
+    def test_dedupe_media_dry_run(self):
+        """Test a dry run reports what a real run reclaims"""
+        user = get_user_model().objects.create_user(
+            'test@gmail.com', 'testpass'
+        )
+        storage = Spot._meta.get_field('image').storage
+        names = [f'uploads/spot/{name}.jpg'
+                 for name in ('first', 'second', 'orphan')]
+        os.makedirs(storage.path('uploads/spot'), exist_ok=True)
+        for name in names:
+            with open(storage.path(name), 'wb') as image_file:
+                image_file.write(b'same content')
+        for name in names[:2]:
+            Spot.objects.create(user=user, name=name, time_minutes=5,
+                                price=5.00, image=name)
+        dry_run = StringIO()
+        out = StringIO()
+
+        call_command('dedupe_media', min_age=0, dry_run=True, stdout=dry_run)
+
+        for name in names:
+            self.assertTrue(storage.exists(name))
+
+        call_command('dedupe_media', min_age=0, stdout=out)
+
+        self.assertIn('Merged 1 duplicate images, removed 1 unreferenced '
+                      'files, reclaimed 24 bytes', dry_run.getvalue())
+        self.assertEqual(dry_run.getvalue(), out.getvalue())
+        Spot.objects.first().image.delete()
+
+    def test_process_pending_images(self):
+        """Test spot images left pending are processed"""
+        user = get_user_model().objects.create_user(
+            'test@gmail.com', 'testpass'
+        )
+        storage = Spot._meta.get_field('image').storage
+        name = 'private/uploads/spot/pending.jpg'
+        os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+        with open(storage.path(name), 'wb') as image_file:
+            image_file.write(b'not an image')
+        spot = Spot.objects.create(
+            user=user, name='Pending', time_minutes=5, price=5.00,
+            image=name, image_status=Spot.IMAGE_PENDING
+        )
+        out = StringIO()
+
+        with self.assertLogs('traveler.images', 'WARNING'):
+            call_command('process_pending_images', min_age=0, stdout=out)
+
+        spot.refresh_from_db()
+        self.assertEqual(spot.image_status, Spot.IMAGE_FAILED)
+        self.assertFalse(storage.exists(name))
+        self.assertIn('Processed 1 pending spot images', out.getvalue())
@@ -0,0 +1,36 @@
+from django.test import TestCase
+
+from core import geohash
+
+
+class GeohashTests(TestCase):
+    """Test geohash encoding and distances"""
+
+    def test_encode(self):
+        """Test encoding a point at several precisions"""
+        self.assertEqual(geohash.encode(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 5), 'u4pru')
+
+    def test_cover_contains_nearby_points(self):
+        """Test the cover of a circle holds points near its edge"""
+        prefixes = geohash.cover(48.8566, 2.3522, 5)
+
+        self.assertEqual(len(prefixes), 9)
+        for latitude, longitude in ((48.8566, 2.3522), (48.8996, 2.3522),
+                                    (48.8566, 2.4200), (48.8200, 2.2900)):
+            point = geohash.encode(latitude, longitude)
+            self.assertTrue(any(point.startswith(p) for p in prefixes))
+
+    def test_cover_whole_earth(self):
+        """Test circles too large for any cell are not pruned"""
+        self.assertIsNone(geohash.cover(0, 0, 10000))
+        self.assertIsNone(geohash.cover(89.9, 0, 50))
+
+    def test_haversine(self):
+        """Test distances between points in kilometers"""
+        paris_london, same = geohash.haversine(
+            48.8566, 2.3522, [51.5074, 48.8566], [-0.1278, 2.3522]
+        )
+
+        self.assertAlmostEqual(paris_london, 343.5, delta=1)
+        self.assertEqual(same, 0)
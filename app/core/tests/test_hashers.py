@@ -0,0 +1,76 @@
+import threading
+
+from django.contrib.auth import authenticate, get_user_model
+from django.test import TestCase, override_settings
+
+from core.hashers import HashingPool, HashingPoolBusy
+
+
+class HashingPoolTests(TestCase):
+    """Test the bounded password hashing pool"""
+
+    def test_run_returns_result(self):
+        """Test functions run in the pool return their result"""
+        pool = HashingPool(workers=1, max_pending=0, timeout=1)
+
+        self.assertEqual(pool.run(pow, 2, 3), 8)
+
+    def test_nested_run_inline(self):
+        """Test a pool function using the pool does not deadlock"""
+        pool = HashingPool(workers=1, max_pending=0, timeout=1)
+
+        self.assertEqual(pool.run(pool.run, pow, 2, 3), 8)
+
+    def test_saturated_pool_busy(self):
+        """Test callers beyond the pool bounds are turned away"""
+        pool = HashingPool(workers=1, max_pending=0, timeout=0.01)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=pool.run, args=(block,))
+        thread.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(HashingPoolBusy):
+                pool.run(pow, 2, 3)
+        finally:
+            release.set()
+            thread.join()
+
+
+class PasswordRehashTests(TestCase):
+    """Test passwords are upgraded to the preferred hasher on login"""
+
+    def login(self):
+        return authenticate(username='test@gmail.com', password='testpass')
+
+    def test_rehash_other_algorithm(self):
+        """Test a PBKDF2 hash is replaced by an Argon2 one"""
+        with override_settings(PASSWORD_HASHERS=[
+            'core.hashers.PooledPBKDF2PasswordHasher'
+        ]):
+            user = get_user_model().objects.create_user(
+                'test@gmail.com', 'testpass'
+            )
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        self.assertEqual(self.login(), user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+
+    def test_rehash_changed_costs(self):
+        """Test changing the Argon2 costs rehashes on the next login"""
+        user = get_user_model().objects.create_user(
+            'test@gmail.com', 'testpass'
+        )
+        costs = {'time_cost': 1, 'memory_cost': 256, 'parallelism': 1}
+
+        with override_settings(PASSWORD_ARGON2_COSTS=costs):
+            self.assertEqual(self.login(), user)
+        user.refresh_from_db()
+
+        self.assertIn('m=256,t=1,p=1', user.password)
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from core.lru import LRUCache
+
+
+class LRUCacheTests(TestCase):
+    """Test the bounded LRU cache"""
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL passes"""
+        cache = LRUCache(max_size=2, ttl=10)
+        with patch('time.monotonic', return_value=100):
+            cache.set('key', 'value')
+        with patch('time.monotonic', return_value=105):
+            self.assertEqual(cache.get('key'), 'value')
+        with patch('time.monotonic', return_value=110):
+            self.assertIsNone(cache.get('key'))
+
+    def test_entries_without_ttl_kept(self):
+        """Test entries never expire without a TTL"""
+        cache = LRUCache(max_size=2)
+        with patch('time.monotonic', return_value=100):
+            cache.set('key', 'value')
+        with patch('time.monotonic', return_value=10 ** 9):
+            self.assertEqual(cache.get('key'), 'value')
+
+    def test_size_bounded(self):
+        """Test the least recently used entry is evicted"""
+        cache = LRUCache(max_size=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
@@ -85,3 +85,23 @@ class ModelTests(TestCase):
 
         exp_path = f'uploads/spot/{uuid}.jpg'
         self.assertEqual(file_path, exp_path)
+
+    def test_spot_save_notes_replaced_image(self):
+        """Test saving a loaded spot notes the image it replaced"""
+        spot = models.Spot.objects.create(
+            user=sample_user(), name='Cliffs', time_minutes=5, price=5.00,
+            image='uploads/spot/old.jpg'
+        )
+        self.assertIsNone(spot.replaced_image)
+
+        spot = models.Spot.objects.get(pk=spot.pk)
+        spot.image = 'uploads/spot/new.jpg'
+        spot.save()
+        self.assertEqual(spot.replaced_image, 'uploads/spot/old.jpg')
+
+        spot.save()
+        self.assertIsNone(spot.replaced_image)
+
+        deferred = models.Spot.objects.defer('image').get(pk=spot.pk)
+        deferred.save()
+        self.assertIsNone(deferred.replaced_image)
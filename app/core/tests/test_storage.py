@@ -0,0 +1,102 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test storing files by the digest of their content"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_names_file_by_digest(self):
+        """Test a file is stored under the digest of its content"""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('photos/photo.JPG', ContentFile(b'content'))
+
+        self.assertEqual(name, f'photos/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'content')
+
+    def test_save_identical_content_once(self):
+        """Test saving content already stored reuses the file"""
+        first = self.storage.save('photos/a.jpg', ContentFile(b'content'))
+        second = self.storage.save('photos/b.jpg', ContentFile(b'content'))
+        other = self.storage.save('photos/c.jpg', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(self.storage.listdir('photos')[0]), 2)
+
+    def test_save_existing_content_leases_it(self):
+        """Test reused content is protected until its lease expires"""
+        name = self.storage.save('photos/a.jpg', ContentFile(b'content'))
+        self.assertFalse(self.storage.is_leased(name))
+
+        mtime = os.path.getmtime(self.storage.path(name))
+
+        self.storage.save('photos/b.jpg', ContentFile(b'content'))
+
+        self.assertTrue(self.storage.is_leased(name))
+        self.assertFalse(self.storage.is_leased('photos/missing.jpg'))
+        self.assertEqual(os.path.getmtime(self.storage.path(name)), mtime)
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.is_leased(name))
+
+    def test_save_uses_known_digest(self):
+        """Test content hashed while uploaded is not hashed again"""
+        content = ContentFile(b'content')
+        content.sha256 = 'ab' * 32
+
+        name = self.storage.save('photos/photo.jpg', content)
+
+        self.assertEqual(name, f'photos/ab/{"ab" * 32}.jpg')
+
+    def test_save_derived_keeps_existing(self):
+        """Test a derived file is written under its exact name once"""
+        name = self.storage.save_derived('photos/x_thumb.jpg',
+                                         ContentFile(b'first'))
+        again = self.storage.save_derived('photos/x_thumb.jpg',
+                                          ContentFile(b'second'))
+
+        self.assertEqual(name, 'photos/x_thumb.jpg')
+        self.assertEqual(again, name)
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'first')
+
+    def test_release_keeps_renewed_lease(self):
+        """Test a lease taken again is not dropped by an earlier holder"""
+        token = self.storage.lease('photos/a.jpg')
+        self.storage.lease('photos/a.jpg')
+
+        self.storage.release('photos/a.jpg', token)
+
+        self.assertTrue(self.storage.is_leased('photos/a.jpg'))
+
+    def test_expire_leases(self):
+        """Test expired leases are removed and current ones kept"""
+        self.storage.lease('photos/old.jpg')
+        self.storage.lease('photos/new.jpg')
+        expired = time.time() - self.storage.lease_seconds - 1
+        os.utime(self.storage.lease_path('photos/old.jpg'),
+                 (expired, expired))
+
+        self.assertEqual(self.storage.expire_leases(dry_run=True), 1)
+        self.assertEqual(self.storage.expire_leases(), 1)
+
+        self.assertFalse(os.path.exists(
+            self.storage.lease_path('photos/old.jpg')
+        ))
+        self.assertTrue(self.storage.is_leased('photos/new.jpg'))
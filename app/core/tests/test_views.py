@@ -0,0 +1,136 @@
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ServeMediaTests(TestCase):
+    """Test serving media files"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.directory.name)
+        self.settings.enable()
+        os.makedirs(os.path.join(self.directory.name, 'uploads'))
+        self.name = 'uploads/photo.jpg'
+        with open(os.path.join(self.directory.name, self.name), 'wb') as f:
+            f.write(b'0123456789')
+        self.url = reverse('media', args=[self.name])
+
+    def tearDown(self):
+        self.settings.disable()
+        self.directory.cleanup()
+
+    def content(self, res):
+        return b''.join(res.streaming_content)
+
+    def test_serve_file(self):
+        """Test a file is sent with validators and caching headers"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.content(res), b'0123456789')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('max-age=3600', res['Cache-Control'])
+
+    def test_serve_content_name_immutable(self):
+        """Test content addressed files are cached for good"""
+        name = f'uploads/{"ab" * 32}_thumbnail.jpg'
+        with open(os.path.join(self.directory.name, name), 'wb') as f:
+            f.write(b'thumbnail')
+
+        res = self.client.get(reverse('media', args=[name]))
+
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('max-age=31536000', res['Cache-Control'])
+
+    def test_content_name_validators_stable(self):
+        """Test content addressed files are tagged by their digest"""
+        name = f'uploads/{"ab" * 32}.jpg'
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as f:
+            f.write(b'photo')
+
+        res = self.client.get(reverse('media', args=[name]))
+        os.utime(path, (0, 0))
+        again = self.client.get(reverse('media', args=[name]))
+
+        self.assertEqual(res['ETag'], f'"{"ab" * 32}"')
+        self.assertEqual(again['ETag'], res['ETag'])
+
+    def test_not_modified(self):
+        """Test a current copy is answered with a 304"""
+        etag = self.client.get(self.url)['ETag']
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_range(self):
+        """Test a byte range is answered with a partial response"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(self.content(res), b'2345')
+        self.assertEqual(res['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(res['Content-Length'], '4')
+
+    def test_suffix_range(self):
+        """Test a range of the last bytes of a file"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(self.content(res), b'789')
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file is refused"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=20-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */10')
+
+    def test_if_range_changed(self):
+        """Test a range of a changed file sends the whole file"""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2-5',
+                              HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.content(res), b'0123456789')
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel-redirect')
+    def test_accel_redirect(self):
+        """Test files are handed to nginx in x-accel-redirect mode"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Accel-Redirect'],
+                         '/protected-media/uploads/photo.jpg')
+        self.assertEqual(res.content, b'')
+
+    def test_missing_file(self):
+        """Test missing files and paths outside media are not found"""
+        res = self.client.get(reverse('media', args=['uploads/missing.jpg']))
+        self.assertEqual(res.status_code, 404)
+
+        res = self.client.get(reverse('media', args=['uploads']))
+        self.assertEqual(res.status_code, 404)
+
+        res = self.client.get(reverse('media', args=['../secret']))
+        self.assertEqual(res.status_code, 404)
+
+    def test_private_files_not_served(self):
+        """Test files under the private media directory are not found"""
+        os.makedirs(os.path.join(self.directory.name, 'private'))
+        with open(os.path.join(self.directory.name, 'private/a.jpg'),
+                  'wb') as f:
+            f.write(b'private')
+
+        for path in ('private/a.jpg', 'uploads/../private/a.jpg'):
+            res = self.client.get(reverse('media', args=[path]))
+            self.assertEqual(res.status_code, 404)
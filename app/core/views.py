@@ -0,0 +1,172 @@
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from core.storage import is_content_name, is_private_name
+
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """File read from its current position up to a number of bytes
+
+    fileno() is kept so WSGI file wrappers can still use sendfile(), which
+    sends Content-Length bytes from the current position.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return the first and last byte of a single range, None if ignored
+
+    Raises ValueError when the range cannot be satisfied. Multiple ranges
+    are ignored and the whole file is sent, which RFC 7233 allows.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    if first > last or first >= size:
+        raise ValueError('Unsatisfiable range')
+
+    return first, last
+
+
+def if_range_matches(request, etag, last_modified):
+    """Return whether the validator of If-Range, if any, is current"""
+    validator = request.META.get('HTTP_IF_RANGE')
+    if not validator:
+        return True
+    if validator.startswith(('"', 'W/')):
+        return validator == etag
+
+    return parse_http_date_safe(validator) == last_modified
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a media file with validators, caching headers and ranges
+
+    Responses are conditional on the ETag and Last-Modified of the file.
+    Files under MEDIA_PRIVATE_DIR are not found.
+    Depending on MEDIA_SERVE_MODE the file is streamed, with a single byte
+    range if one is asked for, or handed to the web server in front.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    if is_private_name(path):
+        raise Http404('Not found')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    try:
+        stat = os.stat(fullpath)
+    except OSError:
+        raise Http404('Not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('Not found')
+
+    size = stat.st_size
+    if is_content_name(path):
+        # The name changes with the content
+        etag = f'"{os.path.splitext(os.path.basename(path))[0]}"'
+    else:
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = file_response(request, path, fullpath, size,
+                                 etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_content_name(path):
+        patch_cache_control(response, public=True, immutable=True,
+                            max_age=IMMUTABLE_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True,
+                            max_age=settings.MEDIA_CACHE_MAX_AGE)
+
+    return response
+
+
+def file_response(request, path, fullpath, size, etag, last_modified):
+    """Return the response sending a file, or handing it off"""
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    # The web server in front handles ranges of files handed to it
+    mode = settings.MEDIA_SERVE_MODE
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + path
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fullpath
+        return response
+
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and \
+            if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        first, last = byte_range
+        file.seek(first)
+        response = FileResponse(RangeFile(file, last - first + 1),
+                                content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+        size = last - first + 1
+    response['Content-Length'] = size
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+
+    return response
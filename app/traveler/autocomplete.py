@@ -0,0 +1,89 @@
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+
+from core.lru import LRUCache
+
+from traveler.cache import get_version
+
+
+def normalize(text):
+    """Return text case folded and without accents, for prefix matching"""
+    decomposed = unicodedata.normalize('NFKD', text)
+
+    return ''.join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+class PrefixIndex:
+    """Sorted array of names answering prefix lookups with a binary search
+
+    Each name is indexed from the start of each of its words, so "fran"
+    completes "San Francisco". A lookup costs O(log n + k) for k results.
+    """
+
+    def __init__(self, objects):
+        entries = []
+        for pk, name in objects:
+            words = normalize(name).split()
+            for start in range(len(words)):
+                entries.append((' '.join(words[start:]), name, pk))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.entries = [(pk, name) for _, name, pk in entries]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def complete(self, prefix, limit):
+        """Return up to limit (id, name) whose words start with prefix"""
+        prefix = ' '.join(normalize(prefix).split())
+        results = []
+        seen = set()
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(results) < limit and \
+                self.keys[position].startswith(prefix):
+            pk, name = self.entries[position]
+            if pk not in seen:
+                seen.add(pk)
+                results.append((pk, name))
+            position += 1
+
+        return results
+
+
+class AutocompleteIndexes:
+    """Per process prefix indexes of the names of each user's objects
+
+    An index is built on its first lookup and kept while the user's
+    traveler data version is unchanged, so writes invalidate it and
+    keystrokes cost no database query.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.indexes = LRUCache(max_size, ttl)
+
+    def get(self, model, user):
+        """Return the current prefix index of a user's objects of a model"""
+        key = (model._meta.label, user.pk)
+        version = get_version(user.pk)
+        entry = self.indexes.get(key)
+        if entry is not None and version is not None and \
+                entry[0] == version:
+            return entry[1]
+
+        index = PrefixIndex(
+            model.objects.filter(user=user).values_list('pk', 'name')
+        )
+        if version is not None:
+            self.indexes.set(key, (version, index))
+
+        return index
+
+
+autocomplete_indexes = AutocompleteIndexes(
+    settings.TRAVELER_AUTOCOMPLETE_USERS,
+    settings.TRAVELER_AUTOCOMPLETE_TTL
+)
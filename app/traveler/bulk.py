@@ -0,0 +1,279 @@
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.models import Spot
+
+from traveler.cache import bump_version
+from traveler.images import collect_image_on_commit
+from traveler.models import SPOT_RELATIONS, bulk_deleting, touch_spots
+from traveler.search import index_spots, indexed_spot_ids
+
+
+def is_id(value):
+    """Return whether a JSON value is an integer id"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def bulk_create(model, instances):
+    """Insert instances, setting their primary keys
+
+    Backends that cannot return the ids of a bulk insert save the instances
+    one by one instead, since the ids are needed for the M2M rows.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model._default_manager.bulk_create(instances)
+
+    for instance in instances:
+        instance.save(force_insert=True)
+
+    return instances
+
+
+def bulk_update(model, instances, fields, batch_size=500):
+    """Write fields of many instances with one CASE update per batch
+
+    auto_now fields are set on every instance, even without other changes.
+    """
+    auto_now = [
+        field.name for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+    ]
+    if not instances or not (fields or auto_now):
+        return
+
+    now = timezone.now()
+    for start in range(0, len(instances), batch_size):
+        batch = instances[start:start + batch_size]
+        updates = {name: Value(now) for name in auto_now}
+        for name in fields:
+            field = model._meta.get_field(name)
+            updates[field.attname] = Case(
+                *[
+                    When(pk=instance.pk, then=Value(
+                        getattr(instance, field.attname), output_field=field
+                    ))
+                    for instance in batch
+                ],
+                default=F(field.attname),
+                output_field=field
+            )
+        model._default_manager.filter(
+            pk__in=[instance.pk for instance in batch]
+        ).update(**updates)
+
+
+def bulk_add_related(model, name, related):
+    """Insert the through rows of many instances with one query
+
+    `related` maps each source instance to the related objects to add.
+    """
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+
+    through.objects.bulk_create([
+        through(**{f'{source}_id': instance.pk, f'{target}_id': obj.pk})
+        for instance, objects in related.items()
+        for obj in objects
+    ])
+
+
+def bulk_set_related(model, name, related):
+    """Make the related objects of many instances match, diffing in memory
+
+    The current through rows of all instances are read with one query,
+    then missing rows are inserted with one query and stale rows deleted
+    with another, each skipped when empty. Return whether anything changed.
+    """
+    if not related:
+        return False
+
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    source = f'{field.m2m_field_name()}_id'
+    target = f'{field.m2m_reverse_field_name()}_id'
+
+    wanted = {
+        instance.pk: {obj.pk for obj in objects}
+        for instance, objects in related.items()
+    }
+    current = {pk: set() for pk in wanted}
+    stale = []
+    for row_id, source_id, target_id in through.objects.filter(**{
+        f'{source}__in': list(wanted)
+    }).values_list('pk', source, target):
+        current[source_id].add(target_id)
+        if target_id not in wanted[source_id]:
+            stale.append(row_id)
+
+    missing = [
+        through(**{source: source_id, target: target_id})
+        for source_id, target_ids in wanted.items()
+        for target_id in target_ids - current[source_id]
+    ]
+    if missing:
+        through.objects.bulk_create(missing)
+    if stale:
+        through.objects.filter(pk__in=stale).delete()
+
+    return bool(missing or stale)
+
+
+class BulkModelMixin:
+    """Create, update and delete lists of objects in one request
+
+    POST, PATCH and DELETE on `<endpoint>/bulk/` take a list of objects,
+    of objects with an `id` and of ids respectively. Every item is
+    validated before anything is written, in one transaction, and invalid
+    requests answer a list of per-item errors in the order of the items.
+    """
+    max_bulk_size = 1000
+    bulk_errors = {
+        'not_a_list': _('Expected a list of items.'),
+        'too_many': _('At most {max_bulk_size} items can be given.'),
+        'invalid_id': _('Expected an integer id.'),
+        'duplicate_id': _('Duplicate id.'),
+        'not_found': _('Not found.'),
+    }
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False)
+    def bulk(self, request):
+        """Create, update or delete a list of objects"""
+        if not isinstance(request.data, list):
+            raise ValidationError([self.bulk_errors['not_a_list']])
+        if len(request.data) > self.max_bulk_size:
+            raise ValidationError([self.bulk_errors['too_many'].format(
+                max_bulk_size=self.max_bulk_size
+            )])
+
+        with transaction.atomic():
+            if request.method == 'POST':
+                response = self.create_many(request.data)
+            elif request.method == 'PATCH':
+                response = self.update_many(request.data)
+            else:
+                response = self.destroy_many(request.data)
+            bump_version(request.user.pk)
+
+        return response
+
+    def get_bulk_queryset(self):
+        """Return the objects a bulk request may update or delete"""
+        return self.queryset.filter(user=self.request.user)
+
+    def get_bulk_instances(self, ids):
+        """Return the owned objects of the ids, raising per-item errors"""
+        ids = [pk if is_id(pk) else None for pk in ids]
+        instances = self.get_bulk_queryset().in_bulk(
+            [pk for pk in ids if pk is not None]
+        )
+        errors = []
+        seen = set()
+        for pk in ids:
+            if pk is None:
+                errors.append({'id': [self.bulk_errors['invalid_id']]})
+            elif pk in seen:
+                errors.append({'id': [self.bulk_errors['duplicate_id']]})
+            elif pk not in instances:
+                errors.append({'id': [self.bulk_errors['not_found']]})
+            else:
+                errors.append({})
+            seen.add(pk)
+        if any(errors):
+            raise ValidationError(errors)
+
+        return [instances[pk] for pk in ids]
+
+    def bulk_response(self, instances, status_code):
+        """Serialize the written objects, reloaded with their relations
+
+        Objects are reloaded without the list filters of the request and
+        answered in the order of the items, so every written object is
+        found at the position of its item.
+        """
+        queryset = self.get_bulk_queryset()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        reloaded = queryset.in_bulk([instance.pk for instance in instances])
+        serializer = self.get_serializer(
+            [reloaded[instance.pk] for instance in instances], many=True
+        )
+
+        return Response(serializer.data, status=status_code)
+
+    def create_many(self, data):
+        serializer = self.get_serializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        instances = serializer.save(user=self.request.user)
+        self.index_instances(instances)
+
+        return self.bulk_response(instances, status.HTTP_201_CREATED)
+
+    def update_many(self, data):
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in data]
+        instances = self.get_bulk_instances(ids)
+        serializer = self.get_serializer(
+            instances, data=data, many=True, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        instances = serializer.save()
+
+        model = self.queryset.model
+        if model in SPOT_RELATIONS:
+            touch_spots(**{f'{SPOT_RELATIONS[model]}__in': instances})
+        self.index_instances(instances)
+
+        return self.bulk_response(instances, status.HTTP_200_OK)
+
+    def index_instances(self, instances):
+        """Reindex the spots written, or those showing written attributes
+
+        Bulk writes send no save or M2M signals for the search index.
+        """
+        model = self.queryset.model
+        if model in SPOT_RELATIONS:
+            index_spots(**{f'{SPOT_RELATIONS[model]}__in': instances})
+        else:
+            index_spots(pk__in=[instance.pk for instance in instances])
+
+    def destroy_many(self, data):
+        """Delete the objects with one query, then update what showed them
+
+        The per row delete handlers are skipped: spots showing deleted
+        tags or locations are touched and reindexed once, images of
+        deleted spots collected once each, and bulk() bumps the version.
+        """
+        instances = self.get_bulk_instances(data)
+        model = self.queryset.model
+        spot_ids = []
+        images = set()
+        if model in SPOT_RELATIONS:
+            lookups = {f'{SPOT_RELATIONS[model]}__in': instances}
+            touch_spots(**lookups)
+            spot_ids = indexed_spot_ids(**lookups)
+        elif model is Spot:
+            images = {
+                instance.image.name for instance in instances
+                if instance.image
+            }
+
+        with bulk_deleting():
+            self.get_bulk_queryset().filter(
+                pk__in=[instance.pk for instance in instances]
+            ).delete()
+        if spot_ids:
+            index_spots(pk__in=spot_ids)
+        for name in images:
+            collect_image_on_commit(name)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,128 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+
+from rest_framework.response import Response
+
+from core.caches import is_shared_cache
+
+
+def get_cache():
+    return caches[settings.TRAVELER_CACHE_ALIAS]
+
+
+def is_enabled():
+    """Return whether traveler data may be cached, see is_shared_cache"""
+    return is_shared_cache(settings.TRAVELER_CACHE_ALIAS)
+
+
+def version_key(user_id):
+    return f'traveler:version:{user_id}'
+
+
+def get_version(user_id):
+    """Return the version of the traveler data of a user
+
+    A missing counter starts from the current time in microseconds rather
+    than 0, so a counter evicted from the cache never repeats a version
+    that cached responses may still be stored under. None is returned when
+    caching is disabled, and nothing must be cached then.
+    """
+    if not is_enabled():
+        return None
+    cache = get_cache()
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000000), None)
+        version = cache.get(key)
+
+    return version
+
+
+def _increment(user_id):
+    cache = get_cache()
+    key = version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000000), None)
+
+
+def bump_version(user_id):
+    """Invalidate every cached traveler response of a user
+
+    The version is bumped right away and again once the transaction
+    commits, so responses cached from data read before the commit are
+    never served afterwards.
+    """
+    if not is_enabled():
+        return
+    _increment(user_id)
+    transaction.on_commit(lambda: _increment(user_id))
+
+
+def normalize_param(value):
+    """Return a canonical form of an id list query parameter value"""
+    parts = value.split(',')
+    if all(part.strip().isdecimal() for part in parts):
+        return ','.join(str(i) for i in sorted({int(part) for part in parts}))
+
+    return value
+
+
+class CachedListMixin:
+    """Cache list responses per user, invalidated by the user's version
+
+    Responses are keyed by user, data version, endpoint and the
+    `cache_query_params`, of which the id lists in `id_list_query_params`
+    are normalized. Their ETag is derived from the key, so a client
+    sending it back in If-None-Match gets a 304 until the data changes.
+    Responses are not cached when the cache is not shared by all processes.
+    """
+    cache_query_params = ()
+    id_list_query_params = ('tags', 'locations')
+
+    def get_list_cache_key(self, request):
+        """Return the cache key of the list response for a request"""
+        params = sorted(
+            (name, normalize_param(request.query_params[name])
+             if name in self.id_list_query_params
+             else request.query_params[name])
+            for name in self.cache_query_params
+            if name in request.query_params
+        )
+        digest = hashlib.md5(
+            repr((request.build_absolute_uri(request.path), params)).encode()
+        ).hexdigest()
+
+        version = get_version(request.user.pk)
+
+        return f'traveler:list:{request.user.pk}:{version}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        if not is_enabled():
+            return super().list(request, *args, **kwargs)
+
+        key = self.get_list_cache_key(request)
+        etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        data = get_cache().get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            get_cache().set(
+                key, response.data, settings.TRAVELER_CACHE_TIMEOUT
+            )
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+
+        return response
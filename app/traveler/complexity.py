@@ -0,0 +1,190 @@
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_snake_case
+from graphql import GraphQLError
+from graphql.execution import ExecutionResult, execute
+from graphql.execution.utils import get_field_def
+from graphql.language.ast import OperationDefinition
+from graphql.type import GraphQLInt, GraphQLList, GraphQLNonNull
+from graphql.utils.type_from_ast import type_from_ast
+from graphql.utils.value_from_ast import value_from_ast
+
+from traveler.optimizer import iter_selections, unwrap_type
+
+
+def get_operation(document_ast, operation_name):
+    """Return the operation of a document that will be executed"""
+    operations = [
+        definition for definition in document_ast.definitions
+        if isinstance(definition, OperationDefinition)
+    ]
+    if operation_name:
+        for operation in operations:
+            if operation.name and operation.name.value == operation_name:
+                return operation
+    elif len(operations) == 1:
+        return operations[0]
+
+    return None
+
+
+def is_list_type(graphql_type):
+    """Return whether a field type is a list"""
+    if isinstance(graphql_type, GraphQLNonNull):
+        graphql_type = graphql_type.of_type
+
+    return isinstance(graphql_type, GraphQLList)
+
+
+def is_connection_type(graphql_type):
+    """Return whether an object type is a relay connection"""
+    graphene_type = getattr(graphql_type, 'graphene_type', None)
+
+    return isinstance(graphene_type, type) and \
+        issubclass(graphene_type, Connection)
+
+
+class QueryCostAnalyzer:
+    """Compute the cost and depth of an operation before it is executed
+
+    Every field costs its weight, 1 unless the object type maps the field
+    to another weight in `complexity_weights`, plus the cost of its
+    selections multiplied by the number of items a list may return: the
+    `first` argument when given, otherwise `default_list_size`.
+    Introspection fields, and the fields selected below them, each cost
+    `introspection_cost` whatever the size of their lists, and are left
+    out of the depth.
+    """
+    introspection_cost = 1
+
+    def __init__(self, schema, fragments, variables, default_list_size):
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+        self.default_list_size = default_list_size
+
+    def measure(self, operation):
+        """Return the cost and depth of an operation"""
+        if operation.operation == 'mutation':
+            root_type = self.schema.get_mutation_type()
+        else:
+            root_type = self.schema.get_query_type()
+
+        return self.selection_cost(root_type, [operation], 1)
+
+    def selection_cost(self, graphql_type, nodes, depth,
+                       introspection=False):
+        """Return the cost and depth of the fields selected below nodes"""
+        graphene_type = getattr(graphql_type, 'graphene_type', None)
+        weights = getattr(graphene_type, 'complexity_weights', {})
+        in_connection = is_connection_type(graphql_type)
+        total_cost = 0
+        max_depth = depth - 1
+
+        for field in iter_selections(nodes, self.fragments):
+            name = field.name.value
+            field_def = get_field_def(self.schema, graphql_type, name)
+            if field_def is None:
+                continue
+            field_introspection = introspection or name.startswith('__')
+            if field_introspection:
+                cost = self.introspection_cost
+            else:
+                cost = weights.get(to_snake_case(name), 1)
+            field_depth = depth
+
+            if field.selection_set is not None:
+                child_cost, field_depth = self.selection_cost(
+                    unwrap_type(field_def.type), [field], depth + 1,
+                    field_introspection
+                )
+                if not field_introspection:
+                    child_cost *= self.multiplier(
+                        field, field_def, in_connection
+                    )
+                cost += child_cost
+
+            total_cost += cost
+            if not field_introspection:
+                max_depth = max(max_depth, field_depth)
+
+        return total_cost, max_depth
+
+    def multiplier(self, field, field_def, in_connection):
+        """Return the number of items a field may resolve to"""
+        for argument in field.arguments or ():
+            if argument.name.value == 'first':
+                first = value_from_ast(
+                    argument.value, GraphQLInt, self.variables
+                )
+                if isinstance(first, int):
+                    return max(first, 0)
+
+        # A connection's edges are already counted by its first argument
+        if in_connection:
+            return 1
+        if is_list_type(field_def.type) or \
+                is_connection_type(unwrap_type(field_def.type)):
+            return self.default_list_size
+
+        return 1
+
+
+def get_variables(schema, operation, variable_values):
+    """Return the variables of an operation including their defaults"""
+    variables = {}
+    for definition in operation.variable_definitions or ():
+        if definition.default_value is not None:
+            variables[definition.variable.name.value] = value_from_ast(
+                definition.default_value,
+                type_from_ast(schema, definition.type)
+            )
+    variables.update(variable_values or {})
+
+    return variables
+
+
+def execute_with_limits(schema, document_ast, max_cost, max_depth,
+                        default_list_size, *args, **kwargs):
+    """Execute a document unless it exceeds the cost or depth budget
+
+    The computed cost is reported in the result extensions.
+    """
+    operation = get_operation(document_ast, kwargs.get('operation_name'))
+    if operation is None:
+        return execute(schema, document_ast, *args, **kwargs)
+
+    fragments = {
+        definition.name.value: definition
+        for definition in document_ast.definitions
+        if not isinstance(definition, OperationDefinition)
+    }
+    analyzer = QueryCostAnalyzer(
+        schema,
+        fragments,
+        get_variables(schema, operation, kwargs.get('variable_values')),
+        default_list_size
+    )
+    cost, depth = analyzer.measure(operation)
+    extensions = {'cost': {
+        'requested': cost, 'maximum': max_cost,
+        'depth': depth, 'maximumDepth': max_depth,
+    }}
+
+    errors = []
+    if depth > max_depth:
+        errors.append(GraphQLError(
+            f'Query depth {depth} exceeds the maximum of {max_depth}'
+        ))
+    if cost > max_cost:
+        errors.append(GraphQLError(
+            f'Query cost {cost} exceeds the maximum of {max_cost}'
+        ))
+    if errors:
+        return ExecutionResult(
+            errors=errors, invalid=True, extensions=extensions
+        )
+
+    result = execute(schema, document_ast, *args, **kwargs)
+    result.extensions.update(extensions)
+
+    return result
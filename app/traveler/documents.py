@@ -0,0 +1,77 @@
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from graphql import parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult
+
+from core.lru import LRUCache
+
+from traveler.complexity import execute_with_limits
+
+
+def query_hash(query):
+    """Return the SHA-256 hex digest persisted query clients send"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def invalid_result(errors, *args, **kwargs):
+    """Execute a document that failed validation"""
+    return ExecutionResult(errors=errors, invalid=True)
+
+
+class CachedDocumentBackend(GraphQLBackend):
+    """Parse and validate each distinct query once
+
+    Documents are cached by schema and the SHA-256 of the query string,
+    which is also the hash persisted query clients send in its place.
+    Executing a document first checks its cost and depth against the
+    budget, by default the GRAPHQL_* settings.
+    """
+
+    def __init__(self, max_size=None, max_cost=None, max_depth=None,
+                 default_list_size=None):
+        self.cache = LRUCache(
+            settings.GRAPHQL_DOCUMENT_CACHE_SIZE if max_size is None
+            else max_size
+        )
+        self.limits = {
+            'max_cost': settings.GRAPHQL_MAX_QUERY_COST if max_cost is None
+            else max_cost,
+            'max_depth': settings.GRAPHQL_MAX_QUERY_DEPTH
+            if max_depth is None else max_depth,
+            'default_list_size': settings.GRAPHQL_DEFAULT_LIST_SIZE
+            if default_list_size is None else default_list_size,
+        }
+
+    def get_document(self, schema, document_hash):
+        """Return the cached document with the given hash, if any"""
+        return self.cache.get((schema, document_hash))
+
+    def document_from_string(self, schema, document_string):
+        key = (schema, query_hash(document_string))
+        document = self.cache.get(key)
+        if document is None:
+            document = self.parse_and_validate(schema, document_string)
+            self.cache.set(key, document)
+
+        return document
+
+    def parse_and_validate(self, schema, document_string):
+        """Build a document, validated ahead of every execution"""
+        document_ast = parse(document_string)
+        errors = validate(schema, document_ast)
+        if errors:
+            run = partial(invalid_result, errors)
+        else:
+            run = partial(
+                execute_with_limits, schema, document_ast, **self.limits
+            )
+
+        return GraphQLDocument(
+            schema=schema,
+            document_string=document_string,
+            document_ast=document_ast,
+            execute=run,
+        )
@@ -0,0 +1,66 @@
+from django.db.models import Count, Exists, OuterRef
+
+from core.models import Spot
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+
+def filter_assigned(queryset, relation):
+    """Return the spot attributes assigned to at least one spot
+
+    Uses an EXISTS semi-join on the spot through table so each attribute
+    is returned once without joining every assignment and deduplicating.
+    """
+    field = Spot._meta.get_field(relation)
+    assignments = field.remote_field.through.objects.filter(
+        **{field.m2m_reverse_field_name(): OuterRef('pk')}
+    )
+
+    return queryset.annotate(
+        assigned=Exists(assignments)
+    ).filter(assigned=True)
+
+
+def filter_related(queryset, relation, ids, match=MATCH_ANY):
+    """Return the spots related to any or all of the given ids
+
+    Neither form joins the through table into the spot query, so each
+    spot is returned once without a DISTINCT over the spot rows.
+    """
+    field = Spot._meta.get_field(relation)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    ids = set(ids)
+
+    if match == MATCH_ALL:
+        # Spots holding every id, counted per spot on the through table
+        matching = through.objects.filter(
+            **{f'{target}__in': ids}
+        ).values(source).annotate(
+            matched=Count(target)
+        ).filter(matched=len(ids)).values(source)
+
+        return queryset.filter(pk__in=matching)
+
+    related = through.objects.filter(
+        **{source: OuterRef('pk'), f'{target}__in': ids}
+    )
+    annotation = f'has_{relation}'
+
+    return queryset.annotate(
+        **{annotation: Exists(related)}
+    ).filter(**{annotation: True})
+
+
+def filter_spots(queryset, tags=None, locations=None, match=MATCH_ANY):
+    """Filter spots by tag and location ids with any/all semantics"""
+    if tags:
+        queryset = filter_related(queryset, 'tags', tags, match)
+    if locations:
+        queryset = filter_related(queryset, 'locations', locations, match)
+
+    return queryset
@@ -0,0 +1,253 @@
+from bisect import bisect_right
+
+from django.db.models import Q
+
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+
+from core import geohash
+from core.models import Location, Spot
+
+
+# Radius the nearest neighbour search starts from and its growth factor
+NEAREST_START_RADIUS = 1.0
+NEAREST_GROWTH = 4
+
+# Half the circumference of the earth, no two points are farther apart
+MAX_RADIUS = 20016.0
+
+
+def parse_point(value):
+    """Return the latitude and longitude of a `lat,lng` string"""
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('Expected latitude,longitude.')
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError('Coordinates are out of range.')
+
+    return latitude, longitude
+
+
+def location_distances(locations, latitude, longitude, radius):
+    """Return the distance in km of each location within radius of a point
+
+    Candidates are pruned with geohash prefix lookups on the B-tree index
+    before exact haversine distances are computed for all of them at once.
+    """
+    candidates = locations.exclude(geohash='')
+    prefixes = geohash.cover(latitude, longitude, radius)
+    if prefixes is not None:
+        matches = Q()
+        for prefix in prefixes:
+            matches |= Q(geohash__startswith=prefix)
+        candidates = candidates.filter(matches)
+
+    rows = list(candidates.values_list('pk', 'latitude', 'longitude'))
+    if not rows:
+        return {}
+    ids, latitudes, longitudes = zip(*rows)
+    distances = geohash.haversine(latitude, longitude, latitudes, longitudes)
+
+    return {
+        pk: distance for pk, distance in zip(ids, distances)
+        if distance <= radius
+    }
+
+
+def spot_distances(spots, locations, latitude, longitude, radius):
+    """Return the distance in km of each spot with a location within radius
+
+    The distance of a spot is that of its nearest location.
+    """
+    located = location_distances(locations, latitude, longitude, radius)
+    if not located:
+        return {}
+
+    distances = {}
+    for spot_id, location_id in Spot.locations.through.objects.filter(
+        location_id__in=list(located), spot__in=spots.values('pk')
+    ).values_list('spot_id', 'location_id'):
+        distance = located[location_id]
+        if distance < distances.get(spot_id, MAX_RADIUS + 1):
+            distances[spot_id] = distance
+
+    return distances
+
+
+def nearest(distances_within, k):
+    """Return the k nearest (id, km), widening the radius searched
+
+    `distances_within(radius)` returns the distances of all objects within
+    radius, so once k are found they are the k nearest.
+    """
+    radius = NEAREST_START_RADIUS
+    while True:
+        distances = distances_within(radius)
+        if len(distances) >= k or radius >= MAX_RADIUS:
+            break
+        radius = min(radius * NEAREST_GROWTH, MAX_RADIUS)
+
+    return sorted(distances.items(), key=lambda item: (item[1], item[0]))[:k]
+
+
+class NearbyMixin:
+    """Filter by distance from a point and find the nearest objects
+
+    `?near=lat,lng&radius=km` lists the objects within radius kilometers
+    of the point, nearest first, and `<endpoint>/nearest/?near=lat,lng&k=`
+    returns the k nearest with their distance. Listed objects are sorted
+    by (distance, id) in Python and fetched in batches of their ids, one
+    page at a time when paginated.
+
+    Views define get_distances(queryset, latitude, longitude, radius),
+    returning the distance of each object of the queryset within radius.
+    """
+    near_ordering = ('distance', 'id')
+    near_batch_size = 500
+    near_distances = None
+    default_radius = 10.0
+    default_nearest = 10
+    max_nearest = 100
+
+    def get_near_point(self, required=False):
+        """Return the point of the near parameter, if any"""
+        value = self.request.query_params.get('near')
+        if not value:
+            if required:
+                raise ValidationError({'near': 'This parameter is required.'})
+            return None
+        try:
+            return parse_point(value)
+        except ValueError as exc:
+            raise ValidationError({'near': str(exc)})
+
+    def get_radius(self):
+        try:
+            radius = float(
+                self.request.query_params.get('radius', self.default_radius)
+            )
+        except ValueError:
+            raise ValidationError({'radius': 'Expected a number.'})
+        if not 0 < radius <= MAX_RADIUS:
+            raise ValidationError({
+                'radius': f'Expected more than 0 and at most {MAX_RADIUS}.'
+            })
+
+        return radius
+
+    def filter_near(self, queryset):
+        """Find the distances of the objects listed near a point, if given
+
+        The queryset is returned as is, the objects within radius are
+        selected from it once listed.
+        """
+        # The nearest action searches without a radius
+        point = self.get_near_point()
+        if point is not None and self.action == 'list':
+            self.near_distances = self.get_distances(
+                queryset, *point, self.get_radius()
+            )
+
+        return queryset
+
+    def near_objects(self, queryset, position=None, limit=None):
+        """Return the objects within radius after a position, nearest first
+
+        Objects get their distance as an attribute. Only batches of the ids
+        sorted after the (distance, id) position are fetched, until limit
+        objects still in the queryset are found.
+        """
+        ranked = sorted(
+            (distance, pk) for pk, distance in self.near_distances.items()
+        )
+        start = 0
+        if position is not None:
+            try:
+                start = bisect_right(ranked, tuple(position))
+            except TypeError:
+                raise NotFound(self.paginator.invalid_cursor_message)
+
+        batch_size = min(limit or self.near_batch_size, self.near_batch_size)
+        objects = []
+        for offset in range(start, len(ranked), batch_size):
+            batch = ranked[offset:offset + batch_size]
+            found = queryset.in_bulk([pk for _, pk in batch])
+            for distance, pk in batch:
+                if pk not in found:
+                    continue
+                found[pk].distance = distance
+                objects.append(found[pk])
+                if len(objects) == limit:
+                    return objects
+
+        return objects
+
+    def filter_queryset(self, queryset):
+        """Return the objects within radius when listed without pages"""
+        queryset = super().filter_queryset(queryset)
+        if self.near_distances is None or (
+            self.paginator is not None and
+            self.paginator.is_requested(self.request)
+        ):
+            return queryset
+
+        return self.near_objects(queryset)
+
+    def paginate_queryset(self, queryset):
+        """Return a page of the objects within radius, nearest first"""
+        if self.near_distances is None or self.paginator is None:
+            return super().paginate_queryset(queryset)
+
+        self.ordering = self.near_ordering
+        return self.paginator.paginate(
+            lambda position, limit: self.near_objects(
+                queryset, position, limit
+            ),
+            self.request, view=self
+        )
+
+    @action(methods=['GET'], detail=False)
+    def nearest(self, request):
+        """Return the k objects nearest to a point with their distance"""
+        latitude, longitude = self.get_near_point(required=True)
+        try:
+            k = int(request.query_params.get('k', self.default_nearest))
+        except ValueError:
+            raise ValidationError({'k': 'Expected an integer.'})
+        k = max(1, min(k, self.max_nearest))
+
+        queryset = self.get_queryset()
+        ranked = nearest(
+            lambda radius: self.get_distances(
+                queryset, latitude, longitude, radius
+            ),
+            k
+        )
+        objects = queryset.in_bulk([pk for pk, _ in ranked])
+        data = self.get_serializer(
+            [objects[pk] for pk, _ in ranked], many=True
+        ).data
+
+        return Response([
+            dict(item, distance=distance)
+            for item, (_, distance) in zip(data, ranked)
+        ])
+
+
+class NearbyLocationsMixin(NearbyMixin):
+
+    def get_distances(self, queryset, latitude, longitude, radius):
+        """Return the distance of each location within radius"""
+        return location_distances(queryset, latitude, longitude, radius)
+
+
+class NearbySpotsMixin(NearbyMixin):
+
+    def get_distances(self, queryset, latitude, longitude, radius):
+        """Return the distance of each spot with a location within radius"""
+        return spot_distances(
+            queryset, Location.objects.filter(user=self.request.user),
+            latitude, longitude, radius
+        )
@@ -0,0 +1,252 @@
+import logging
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, features
+
+from core.models import Spot, spot_image_file_path, \
+    spot_image_variant_path
+from core.pools import LazyThreadPool
+
+from traveler.cache import bump_version
+
+
+logger = logging.getLogger(__name__)
+
+# Refuse to decode images larger than uploads may be
+Image.MAX_IMAGE_PIXELS = settings.SPOT_IMAGE_MAX_PIXELS
+
+# EXIF orientation tag and the transpositions undoing each orientation
+ORIENTATION = 274
+ORIENTATION_TRANSPOSES = {
+    2: (Image.FLIP_LEFT_RIGHT,),
+    3: (Image.ROTATE_180,),
+    4: (Image.FLIP_TOP_BOTTOM,),
+    5: (Image.ROTATE_90, Image.FLIP_TOP_BOTTOM),
+    6: (Image.ROTATE_270,),
+    7: (Image.ROTATE_270, Image.FLIP_TOP_BOTTOM),
+    8: (Image.ROTATE_90,),
+}
+
+# Extensions of the variant formats
+VARIANT_EXTENSIONS = ('jpg', 'png', 'webp')
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+
+
+class ImageWorkerPool(LazyThreadPool):
+    """Local thread pool processing spot images off the request thread
+
+    No broker is involved: tasks live in the memory of the process that
+    accepted the upload, and tasks lost with it are scheduled again by the
+    process_pending_images command. With no workers, tasks run in the
+    calling thread.
+    """
+    thread_name_prefix = 'spot-images'
+
+    def submit(self, fn, *args):
+        if not self.workers:
+            return self._call(fn, args)
+
+        return self.executor.submit(self._run, fn, args)
+
+    def _run(self, fn, args):
+        close_old_connections()
+        try:
+            return self._call(fn, args)
+        finally:
+            close_old_connections()
+
+    def _call(self, fn, args):
+        # Failures are logged, not raised into the request that committed
+        try:
+            return fn(*args)
+        except Exception:
+            logger.exception('Processing spot image failed')
+
+
+image_pool = ImageWorkerPool(settings.SPOT_IMAGE_WORKERS)
+
+
+def variant_formats(image):
+    """Return the extension and format of each variant of an image"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        formats = [('png', 'PNG')]
+    else:
+        formats = [('jpg', 'JPEG')]
+    if features.check('webp'):
+        formats.append(('webp', 'WEBP'))
+
+    return formats
+
+
+def variant_names(name):
+    """Return the variant paths of an image by variant and extension
+
+    All the extensions variants may have are listed, whichever formats
+    this process can encode.
+    """
+    return {
+        variant: {
+            ext: spot_image_variant_path(name, variant, ext)
+            for ext in VARIANT_EXTENSIONS
+        }
+        for variant in settings.SPOT_IMAGE_VARIANTS
+    }
+
+
+def variant_urls(spot, request=None):
+    """Return the URLs of the processed variants of a spot image
+
+    URLs are built from the formats stored on the spot, without looking
+    the variants up in the storage.
+    """
+    if not spot.image or spot.image_status != Spot.IMAGE_READY:
+        return {}
+
+    storage = spot.image.storage
+    extensions = [ext for ext in spot.image_formats.split(',') if ext]
+    urls = {}
+    for variant in settings.SPOT_IMAGE_VARIANTS:
+        for ext in extensions:
+            url = storage.url(
+                spot_image_variant_path(spot.image.name, variant, ext)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.setdefault(variant, {})[ext] = url
+
+    return urls
+
+
+def get_orientation(image):
+    """Return the EXIF orientation of an image, if any"""
+    if hasattr(image, 'getexif'):
+        return image.getexif().get(ORIENTATION)
+    exif = image._getexif() if hasattr(image, '_getexif') else None
+
+    return (exif or {}).get(ORIENTATION)
+
+
+def open_image(data):
+    """Verify image data and return it decoded, upright and metadata free"""
+    Image.open(BytesIO(data)).verify()
+
+    # verify() leaves the image unusable, so it is opened again
+    image = Image.open(BytesIO(data))
+    image_format = image.format
+    orientation = get_orientation(image)
+    image.load()
+    for transpose in ORIENTATION_TRANSPOSES.get(orientation, ()):
+        image = image.transpose(transpose)
+    if image.mode == 'P':
+        image = image.convert('RGBA')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGB')
+    image.info = {}
+
+    return image, image_format
+
+
+def encode_image(image, image_format):
+    """Return an image encoded in a format as file content"""
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    content = BytesIO()
+    image.save(content, format=image_format,
+               **SAVE_OPTIONS.get(image_format, {}))
+
+    return ContentFile(content.getvalue())
+
+
+def process_spot_image(spot_id, name):
+    """Strip the metadata of a spot image and build its variants
+
+    The stripped image is stored as new content and replaces the private
+    upload on the spot, variants are stored next to it. Images that cannot
+    be processed are removed. Does nothing if the spot image was replaced
+    since it was scheduled.
+    """
+    spot = Spot.objects.filter(pk=spot_id, image=name).first()
+    if spot is None:
+        return
+
+    storage = spot.image.storage
+    stripped = ''
+    image_formats = ''
+    try:
+        with storage.open(name) as image_file:
+            image, image_format = open_image(image_file.read())
+        stripped = storage.save(
+            spot_image_file_path(spot, name),
+            encode_image(image, image_format)
+        )
+        formats = variant_formats(image)
+        for variant, size in settings.SPOT_IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            for ext, variant_format in formats:
+                storage.save_derived(
+                    spot_image_variant_path(stripped, variant, ext),
+                    encode_image(resized, variant_format)
+                )
+        image_formats = ','.join(ext for ext, _ in formats)
+        image_status = Spot.IMAGE_READY
+    except (IOError, SyntaxError, ValueError, Image.DecompressionBombError):
+        logger.warning('Spot %s has an invalid image %s', spot_id, name)
+        # A copy stored before the failure is not referenced by any spot
+        collect_image(stripped)
+        # The upload still has its metadata, so it is never published
+        stripped, image_status = '', Spot.IMAGE_FAILED
+
+    Spot.objects.filter(pk=spot_id, image=name).update(
+        image=stripped, image_status=image_status,
+        image_formats=image_formats, updated_at=timezone.now()
+    )
+    bump_version(spot.user_id)
+    if stripped != name:
+        collect_image(name)
+
+
+def collect_image(name):
+    """Delete a stored image and its variants if no spot references it
+
+    Images leased by a save that may not be committed yet are kept. The
+    references and the lease are checked under the storage lock, so a
+    save reusing the image either leases it first or stores it again.
+    Returns whether the image was deleted.
+    """
+    if not name:
+        return False
+
+    storage = Spot._meta.get_field('image').storage
+    with storage.locked():
+        if Spot.objects.filter(image=name).exists() or \
+                storage.is_leased(name):
+            return False
+        for names in variant_names(name).values():
+            for variant in names.values():
+                storage.delete(variant)
+        storage.delete(name)
+
+    return True
+
+
+def collect_image_on_commit(name):
+    """Collect an image once the transaction releasing it commits"""
+    transaction.on_commit(lambda: collect_image(name))
+
+
+def schedule_spot_image(spot):
+    """Process the image of a spot in the pool once the upload commits"""
+    spot_id, name = spot.pk, spot.image.name
+    transaction.on_commit(
+        lambda: image_pool.submit(process_spot_image, spot_id, name)
+    )
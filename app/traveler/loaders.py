@@ -0,0 +1,87 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from core.models import Spot
+
+
+class ModelLoader(DataLoader):
+    """Batch load model instances by primary key"""
+
+    def __init__(self, model, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = model
+
+    def batch_load_fn(self, keys):
+        objects = self.model._default_manager.in_bulk(keys)
+
+        return Promise.resolve([objects.get(key) for key in keys])
+
+
+class ThroughLoader(DataLoader):
+    """Batch load the objects linked to many instances by a through table"""
+
+    def __init__(self, through, source, target, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.through = through
+        self.source = source
+        self.target = target
+
+    def batch_load_fn(self, keys):
+        rows = self.through.objects.filter(
+            **{f'{self.source}__in': keys}
+        ).select_related(self.target).order_by(self.target)
+
+        related = defaultdict(list)
+        for row in rows:
+            related[getattr(row, f'{self.source}_id')].append(
+                getattr(row, self.target)
+            )
+
+        return Promise.resolve([related[key] for key in keys])
+
+
+class Loaders:
+    """DataLoaders for the traveler GraphQL types, cached per request"""
+
+    def __init__(self):
+        self.users = ModelLoader(get_user_model())
+        self.spot_tags = ThroughLoader(Spot.tags.through, 'spot', 'tag')
+        self.spot_locations = ThroughLoader(
+            Spot.locations.through, 'spot', 'location'
+        )
+        self.location_spots = ThroughLoader(
+            Spot.locations.through, 'location', 'spot'
+        )
+        self.tag_spots = ThroughLoader(Spot.tags.through, 'tag', 'spot')
+
+
+def get_loaders(context):
+    """Return the loaders of a request, creating them on first use"""
+    loaders = getattr(context, 'traveler_loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context.traveler_loaders = loaders
+
+    return loaders
+
+
+def load_one(instance, name, loader):
+    """Return a foreign key if it was selected, otherwise batch load it"""
+    field = instance._meta.get_field(name)
+    if field.is_cached(instance):
+        return getattr(instance, name)
+
+    return loader.load(getattr(instance, field.attname))
+
+
+def load_many(instance, name, loader):
+    """Return related objects if prefetched, otherwise batch load them"""
+    manager = getattr(instance, name)
+    prefetched = getattr(instance, '_prefetched_objects_cache', {})
+    if manager.prefetch_cache_name in prefetched:
+        return manager.all()
+
+    return loader.load(instance.pk)
@@ -0,0 +1,149 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Tag, Location, Spot
+
+from traveler.cache import bump_version
+from traveler.images import collect_image_on_commit
+from traveler.search import index_spots, indexed_spot_ids
+
+
+# Set in a thread while a bulk delete handles its side effects itself
+_bulk_delete = threading.local()
+
+
+@contextmanager
+def bulk_deleting():
+    """Skip the per row delete handlers, for callers handling them once"""
+    _bulk_delete.active = True
+    try:
+        yield
+    finally:
+        _bulk_delete.active = False
+
+
+def is_bulk_deleting():
+    return getattr(_bulk_delete, 'active', False)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reset_user_version(sender, instance=None, created=False, **kwargs):
+    if created:
+        bump_version(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Spot)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Spot)
+def bump_owner_version(sender, instance=None, **kwargs):
+    """Invalidate the cached traveler responses of the owner"""
+    if not is_bulk_deleting():
+        bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Spot.tags.through)
+@receiver(m2m_changed, sender=Spot.locations.through)
+def bump_relation_version(sender, instance=None, action=None, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(instance.user_id)
+
+
+# Spot relation of each model spots are serialized with
+SPOT_RELATIONS = {Tag: 'tags', Location: 'locations'}
+
+
+def touch_spots(**lookups):
+    """Mark spots as updated, changing their ETag and Last-Modified"""
+    Spot.objects.filter(**lookups).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Location)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Location)
+def touch_spots_of(sender, instance=None, created=False, **kwargs):
+    """Touch the spots a renamed or deleted tag or location is shown in"""
+    if not created and not is_bulk_deleting():
+        touch_spots(**{SPOT_RELATIONS[sender]: instance})
+
+
+@receiver(m2m_changed, sender=Spot.tags.through)
+@receiver(m2m_changed, sender=Spot.locations.through)
+def touch_related_spots(sender, instance=None, action=None, reverse=False,
+                        pk_set=None, **kwargs):
+    """Touch the spots whose tags or locations were changed"""
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        touch_spots(pk=instance.pk)
+    elif reverse and action in ('post_add', 'post_remove'):
+        touch_spots(pk__in=pk_set)
+    elif reverse and action == 'pre_clear':
+        touch_spots(**{SPOT_RELATIONS[type(instance)]: instance})
+
+
+@receiver(post_save, sender=Spot)
+def index_saved_spot(sender, instance=None, **kwargs):
+    index_spots(pk=instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Location)
+def index_spots_of(sender, instance=None, created=False, **kwargs):
+    """Reindex the spots a renamed tag or location is searched by"""
+    if not created:
+        index_spots(**{SPOT_RELATIONS[sender]: instance})
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Location)
+def remember_indexed_spots(sender, instance=None, **kwargs):
+    if is_bulk_deleting():
+        return
+    instance._indexed_spot_ids = indexed_spot_ids(
+        **{SPOT_RELATIONS[sender]: instance}
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Location)
+def index_remembered_spots(sender, instance=None, **kwargs):
+    """Reindex the spots a deleted tag or location was removed from"""
+    spot_ids = getattr(instance, '_indexed_spot_ids', None)
+    if spot_ids:
+        index_spots(pk__in=spot_ids)
+
+
+@receiver(m2m_changed, sender=Spot.tags.through)
+@receiver(m2m_changed, sender=Spot.locations.through)
+def index_related_spots(sender, instance=None, action=None, reverse=False,
+                        pk_set=None, **kwargs):
+    """Reindex the spots whose tags or locations were changed"""
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        index_spots(pk=instance.pk)
+    elif reverse and action in ('post_add', 'post_remove'):
+        index_spots(pk__in=pk_set)
+    elif reverse and action == 'pre_clear':
+        remember_indexed_spots(type(instance), instance)
+    elif reverse and action == 'post_clear':
+        index_remembered_spots(type(instance), instance)
+
+
+@receiver(post_save, sender=Spot)
+def release_replaced_image(sender, instance=None, **kwargs):
+    """Collect the previous image of a spot if nothing else uses it"""
+    if instance.replaced_image:
+        collect_image_on_commit(instance.replaced_image)
+
+
+@receiver(post_delete, sender=Spot)
+def release_deleted_image(sender, instance=None, **kwargs):
+    if instance.image and not is_bulk_deleting():
+        collect_image_on_commit(instance.image.name)
@@ -0,0 +1,163 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.relay import Connection
+from graphene.utils.str_converters import to_snake_case
+from graphql.language.ast import FragmentSpread, InlineFragment
+
+
+def unwrap_type(graphql_type):
+    """Return the named type wrapped by List and NonNull types"""
+    while hasattr(graphql_type, 'of_type'):
+        graphql_type = graphql_type.of_type
+
+    return graphql_type
+
+
+def iter_selections(nodes, fragments):
+    """Yield the field nodes selected below the nodes
+
+    Fragment spreads and inline fragments are expanded in place, fragments
+    maps the names of the fragments of the document to their definitions.
+    """
+    for node in nodes:
+        if node.selection_set is None:
+            continue
+        for selection in node.selection_set.selections:
+            if isinstance(selection, FragmentSpread):
+                fragment = fragments.get(selection.name.value)
+                if fragment is not None:
+                    yield from iter_selections([fragment], fragments)
+            elif isinstance(selection, InlineFragment):
+                yield from iter_selections([selection], fragments)
+            else:
+                yield selection
+
+
+def get_model_field(model, name):
+    """Return the model field or reverse relation named in a schema"""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+
+    return None
+
+
+class QueryPlan:
+    """Columns and relations a selection set needs from one model"""
+
+    def __init__(self, model):
+        self.only = {model._meta.pk.name}
+        self.select_related = []
+        self.prefetch_related = []
+
+    def merge(self, prefix, plan):
+        """Merge the plan of a model reached through a foreign key"""
+        self.only.update(f'{prefix}__{name}' for name in plan.only)
+        self.select_related.append(prefix)
+        self.select_related.extend(
+            f'{prefix}__{name}' for name in plan.select_related
+        )
+        for prefetch in plan.prefetch_related:
+            self.prefetch_related.append(Prefetch(
+                f'{prefix}__{prefetch.prefetch_through}',
+                queryset=prefetch.queryset
+            ))
+
+    def apply(self, queryset):
+        """Restrict a queryset to the columns and relations of the plan"""
+        queryset = queryset.only(*self.only)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+
+        return queryset
+
+
+class QueryOptimizer:
+    """Translate the selection set of a resolver into queryset calls
+
+    Object types may declare `optimizer_hints`, mapping the python name of
+    a field that is not backed by a model field to the columns it reads.
+    """
+
+    def __init__(self, info):
+        self.info = info
+
+    def optimize(self, queryset):
+        """Optimize the queryset returned by the resolver of self.info"""
+        graphql_type = unwrap_type(self.info.return_type)
+        nodes = self.info.field_asts
+        graphene_type = getattr(graphql_type, 'graphene_type', None)
+        if isinstance(graphene_type, type) and \
+                issubclass(graphene_type, Connection):
+            graphql_type, nodes = self.connection_nodes(graphql_type, nodes)
+
+        plan = self.plan(queryset.model, graphql_type, nodes)
+
+        return plan.apply(queryset)
+
+    def connection_nodes(self, graphql_type, nodes):
+        """Return the node type and nodes selected below edges { node }"""
+        edges_type = unwrap_type(graphql_type.fields['edges'].type)
+        edges = self.group_selections(nodes).get('edges', [])
+        node_type = unwrap_type(edges_type.fields['node'].type)
+
+        return node_type, self.group_selections(edges).get('node', [])
+
+    def plan(self, model, graphql_type, nodes):
+        """Build the query plan of a model for the given field nodes"""
+        plan = QueryPlan(model)
+        graphene_type = getattr(graphql_type, 'graphene_type', None)
+        hints = getattr(graphene_type, 'optimizer_hints', {})
+
+        for name, field_nodes in self.group_selections(nodes).items():
+            graphql_field = graphql_type.fields.get(name)
+            if graphql_field is None:
+                continue
+            field_name = to_snake_case(name)
+            plan.only.update(hints.get(field_name, ()))
+
+            field = get_model_field(model, field_name)
+            if field is None:
+                continue
+            if not field.is_relation:
+                plan.only.add(field.name)
+                continue
+
+            related_type = unwrap_type(graphql_field.type)
+            related_plan = self.plan(
+                field.related_model, related_type, field_nodes
+            )
+            if field.many_to_one or (field.one_to_one and field.concrete):
+                plan.only.add(field.name)
+                plan.merge(field.name, related_plan)
+                continue
+            if field.one_to_many:
+                related_plan.only.add(field.field.name)
+
+            plan.prefetch_related.append(Prefetch(
+                field_name,
+                queryset=related_plan.apply(
+                    field.related_model._default_manager.all()
+                )
+            ))
+
+        return plan
+
+    def group_selections(self, nodes):
+        """Group the fields selected below the nodes by field name"""
+        selections = {}
+        for field in iter_selections(nodes, self.info.fragments):
+            if not field.name.value.startswith('__'):
+                selections.setdefault(field.name.value, []).append(field)
+
+        return selections
+
+
+def optimize_queryset(queryset, info):
+    """Load only the columns and relations selected by the query"""
+    return QueryOptimizer(info).optimize(queryset)
@@ -0,0 +1,192 @@
+import base64
+import binascii
+import json
+import math
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination seeking on the view's ordering columns
+
+    Pages are fetched with a `WHERE (columns) < (last row)` seek instead of
+    an OFFSET, so deep pages cost the same as the first one. Pagination is
+    opt-in: requests without a cursor or page size get the plain list.
+    """
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = _('Invalid cursor')
+
+    def is_requested(self, request):
+        """Return whether the request asks for a page"""
+        params = request.query_params
+
+        return self.cursor_query_param in params or \
+            self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return one page of the queryset, or None when not requested"""
+        def fetch(position, limit):
+            rows = queryset.order_by(*self.ordering)
+            if position is not None:
+                rows = rows.filter(self.seek_filter(
+                    self.position_values(queryset, position)
+                ))
+
+            return list(rows[:limit])
+
+        return self.paginate(fetch, request, view)
+
+    def paginate(self, fetch, request, view=None):
+        """Return one page of `fetch(position, limit)`, if requested
+
+        fetch returns up to limit objects after the decoded cursor position,
+        or from the start, in the view's ordering.
+        """
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.ordering = getattr(view, 'ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+
+        results = fetch(self.decode_cursor(request), self.page_size + 1)
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        return self.page
+
+    def get_page_size(self, request):
+        """Return the requested page size bounded by max_page_size"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def position_values(self, queryset, position):
+        """Return the cursor values as the types of their columns"""
+        values = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            annotation = queryset.query.annotations.get(name)
+            if annotation is not None:
+                column = annotation.output_field
+            else:
+                column = queryset.model._meta.get_field(name)
+            try:
+                value = column.to_python(value)
+            except (ValidationError, TypeError, ValueError, OverflowError):
+                raise NotFound(self.invalid_cursor_message)
+            if not self.in_range(column, value, queryset.db):
+                raise NotFound(self.invalid_cursor_message)
+            values.append(value)
+
+        return values
+
+    @staticmethod
+    def in_range(column, value, using):
+        """Return whether a cursor value is finite and fits its column"""
+        if isinstance(value, float):
+            return math.isfinite(value)
+        if isinstance(value, Decimal):
+            if not value.is_finite():
+                return False
+            if column.max_digits is None:
+                return True
+            limit = Decimal(10) ** (column.max_digits - column.decimal_places)
+            return abs(value) < limit
+        if isinstance(value, int):
+            ops = connections[using].ops
+            # Auto fields have the range of the integer field they are
+            internal_type = column.get_internal_type()
+            internal_type = {
+                'AutoField': 'IntegerField',
+                'BigAutoField': 'BigIntegerField',
+            }.get(internal_type, internal_type)
+            if internal_type not in ops.integer_field_ranges:
+                return True
+            low, high = ops.integer_field_range(internal_type)
+            return (low is None or value >= low) and \
+                (high is None or value <= high)
+
+        return True
+
+    def seek_filter(self, position):
+        """Build a filter selecting the rows after the given position"""
+        seek = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            seek |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        return seek
+
+    def decode_cursor(self, request):
+        """Return the position encoded in the cursor parameter"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering) or \
+                not all(self.is_scalar(value) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    @staticmethod
+    def is_scalar(value):
+        """Return whether a decoded cursor value can be compared to a column"""
+        return isinstance(value, (int, float, str)) and \
+            not isinstance(value, bool)
+
+    def encode_cursor(self, instance):
+        """Encode the ordering values of an instance as a cursor"""
+        position = [
+            getattr(instance, field.lstrip('-')) for field in self.ordering
+        ]
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode())
+
+        return encoded.decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(
+            url, self.page_size_query_param, self.page_size
+        )
+
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -1,53 +1,266 @@
 import graphene
 
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from graphene_django.types import DjangoObjectType
-from core.models import Spot, Location
+from graphql import GraphQLError
+from graphql_relay.utils import base64, unbase64
+from core.models import Spot, Location, Tag
+
+from traveler.loaders import get_loaders, load_many, load_one
+from traveler.optimizer import optimize_queryset
+from traveler.search import search_spots
+from traveler import stats
+
+
+SPOTS_PAGE_SIZE = 20
+SPOTS_MAX_PAGE_SIZE = 100
+
+
+def spot_cursor(spot):
+    """Return the opaque connection cursor of a spot"""
+    return base64(f'spot:{spot.id}')
+
+
+def cursor_to_spot_id(cursor):
+    """Return the spot id encoded in a connection cursor"""
+    try:
+        prefix, spot_id = unbase64(cursor).split(':')
+        if prefix != 'spot':
+            raise ValueError(prefix)
+        return int(spot_id)
+    except (TypeError, ValueError):
+        raise GraphQLError('Invalid cursor')
+
+
+def search_cursor(spot):
+    """Return the opaque cursor of a spot in ranked search results"""
+    return base64(f'search:{spot.rank!r}:{spot.id}')
+
+
+def cursor_to_search_position(cursor):
+    """Return the rank and spot id encoded in a search cursor"""
+    try:
+        prefix, rank, spot_id = unbase64(cursor).split(':')
+        if prefix != 'search':
+            raise ValueError(prefix)
+        return float(rank), int(spot_id)
+    except (TypeError, ValueError):
+        raise GraphQLError('Invalid cursor')
+
+
+def get_page_size(first):
+    """Return the number of spots to return in a connection page"""
+    if first is None:
+        return SPOTS_PAGE_SIZE
+
+    return max(0, min(first, SPOTS_MAX_PAGE_SIZE))
+
+
+def spot_connection(queryset, info, first, after, cursor):
+    """Return the connection of the first spots of an ordered queryset"""
+    spots = list(optimize_queryset(queryset, info)[:first + 1])
+    edges = [
+        SpotConnection.Edge(node=spot, cursor=cursor(spot))
+        for spot in spots[:first]
+    ]
+
+    return SpotConnection(
+        edges=edges,
+        page_info=graphene.relay.PageInfo(
+            has_next_page=len(spots) > first,
+            has_previous_page=bool(after),
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None,
+        )
+    )
+
+
+class UserType(DjangoObjectType):
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'name')
 
 
 class SpotType(DjangoObjectType):
     class Meta:
         model = Spot
+        exclude = ('search_vector',)
 
     price_rating = graphene.String()
 
+    optimizer_hints = {'price_rating': ('price',)}
+
     def resolve_price_rating(self, info):
         return "Reasonable" if self.price < 20 else "Expensive"
 
+    def resolve_user(self, info):
+        return load_one(self, 'user', get_loaders(info.context).users)
+
+    def resolve_tags(self, info):
+        return load_many(
+            self, 'tags', get_loaders(info.context).spot_tags
+        )
+
+    def resolve_locations(self, info):
+        return load_many(
+            self, 'locations', get_loaders(info.context).spot_locations
+        )
+
 
 class LocationType(DjangoObjectType):
     class Meta:
         model = Location
+        exclude = ('geohash',)
+
+    def resolve_user(self, info):
+        return load_one(self, 'user', get_loaders(info.context).users)
+
+    def resolve_spot_set(self, info):
+        return load_many(
+            self, 'spot_set', get_loaders(info.context).location_spots
+        )
+
+
+class TagType(DjangoObjectType):
+    class Meta:
+        model = Tag
+
+    def resolve_user(self, info):
+        return load_one(self, 'user', get_loaders(info.context).users)
+
+    def resolve_spot_set(self, info):
+        return load_many(
+            self, 'spot_set', get_loaders(info.context).tag_spots
+        )
+
+
+class SpotConnection(graphene.relay.Connection):
+    class Meta:
+        node = SpotType
+
+
+SpotStatField = graphene.Enum(
+    'SpotStatField', [(field.upper(), field) for field in stats.STAT_FIELDS]
+)
+
+SpotStatGroup = graphene.Enum(
+    'SpotStatGroup',
+    [(group.upper(), group) for group in stats.GROUP_RELATIONS]
+)
+
+
+class PercentileType(graphene.ObjectType):
+    percentile = graphene.Float()
+    value = graphene.Float()
+
+
+class HistogramBucketType(graphene.ObjectType):
+    lower = graphene.Float()
+    upper = graphene.Float()
+    count = graphene.Int()
+
+
+class SpotStatsGroupType(graphene.ObjectType):
+    id = graphene.Int()
+    name = graphene.String()
+    count = graphene.Int()
+    avg = graphene.Float()
+    min = graphene.Float()
+    max = graphene.Float()
+    percentiles = graphene.List(PercentileType)
+    histogram = graphene.List(HistogramBucketType)
+
+
+class SpotStatsType(graphene.ObjectType):
+    field = graphene.String()
+    group_by = graphene.String()
+    groups = graphene.List(SpotStatsGroupType)
 
 
 class Query(graphene.ObjectType):
-    all_spots = graphene.List(SpotType)
+    all_spots = graphene.relay.ConnectionField(SpotConnection)
+    search_spots = graphene.relay.ConnectionField(
+        SpotConnection, query=graphene.String(required=True)
+    )
     spot = graphene.Field(SpotType, id=graphene.Int(),
                           name=graphene.String())
+    spot_stats = graphene.Field(
+        SpotStatsType, field=SpotStatField(required=True),
+        group_by=SpotStatGroup(), buckets=graphene.Int()
+    )
 
-    def resolve_all_spots(self, info, **kwargs):
+    # Resolvers ranking or aggregating every spot of the user cost more
+    # than a field read from a loaded row
+    complexity_weights = {'search_spots': 50, 'spot_stats': 100}
+
+    def resolve_all_spots(self, info, first=None, after=None, **kwargs):
+        """Return a page of the authenticated user's spots"""
+        user = info.context.user
+        if not user.is_authenticated:
+            raise Exception('Auth Fail')
+        if kwargs.get('last') is not None or kwargs.get('before'):
+            raise GraphQLError('Only first and after are supported')
+
+        queryset = Spot.objects.filter(user=user).order_by('id')
+        if after:
+            queryset = queryset.filter(id__gt=cursor_to_spot_id(after))
+
+        return spot_connection(
+            queryset, info, get_page_size(first), after, spot_cursor
+        )
+
+    def resolve_search_spots(self, info, query, first=None, after=None,
+                             **kwargs):
+        """Return a page of the user's spots matching a search, best first"""
         user = info.context.user
         if not user.is_authenticated:
             raise Exception('Auth Fail')
+        if kwargs.get('last') is not None or kwargs.get('before'):
+            raise GraphQLError('Only first and after are supported')
+        query = query.strip()
+        if not query:
+            raise GraphQLError('Expected a search query')
 
-        #"""Return objects for the current authenticated user only"""
-        #assigned_only = bool(
-        #    int(self.request.query_params.get('assigned_only', 0))
-        #)
-        #queryset = self.queryset
-        #if assigned_only:
-        #    queryset = queryset.filter(spot__isnull=False)
+        queryset = search_spots(
+            Spot.objects.filter(user=user), user, query
+        ).order_by('-rank', '-id')
+        if after:
+            rank, spot_id = cursor_to_search_position(after)
+            queryset = queryset.filter(
+                Q(rank__lt=rank) | Q(rank=rank, id__lt=spot_id)
+            )
 
-        return Spot.objects.all()
+        return spot_connection(
+            queryset, info, get_page_size(first), after, search_cursor
+        )
 
     def resolve_spot(self, info, **kwargs):
+        """Return one of the authenticated user's spots by id or name"""
+        user = info.context.user
+        if not user.is_authenticated:
+            raise Exception('Auth Fail')
         id = kwargs.get('id')
+        queryset = optimize_queryset(Spot.objects.filter(user=user), info)
 
         if id is not None:
-            return Spot.objects.get(pk=id)
+            return queryset.get(pk=id)
 
         name = kwargs.get('name')
 
         if name is not None:
-            return Spot.objects.get(name=name)
+            # Names are not unique, the first spot named so is returned
+            return queryset.filter(name=name).order_by('id').first()
 
         return None
+
+    def resolve_spot_stats(self, info, field, group_by=None,
+                           buckets=stats.DEFAULT_BUCKETS):
+        """Return statistics of a field of the authenticated user's spots"""
+        user = info.context.user
+        if not user.is_authenticated:
+            raise Exception('Auth Fail')
+        if not 1 <= buckets <= stats.MAX_BUCKETS:
+            raise GraphQLError(f'Expected 1 to {stats.MAX_BUCKETS} buckets')
+
+        return stats.spot_stats(user, field, group_by, buckets)
@@ -0,0 +1,207 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, \
+    TextField, Value, When
+from django.db.models.functions import Cast
+
+from core.models import Spot
+
+from traveler.cache import get_cache, get_version
+
+
+# Weights of ts_rank for the A (name) and B (tags and locations) labels
+NAME_WEIGHT = 1.0
+RELATED_WEIGHT = 0.4
+
+SEARCH_RELATIONS = ('tags', 'locations')
+
+
+def uses_search_vector():
+    """Return whether spots are searched by their stored tsvector"""
+    return connection.vendor == 'postgresql'
+
+
+def spot_vector():
+    """Return the expression of the search vector of a spot"""
+    from django.contrib.postgres.aggregates import StringAgg
+
+    config = settings.TRAVELER_SEARCH_CONFIG
+    vector = SearchVector('name', weight='A', config=config)
+    for relation in SEARCH_RELATIONS:
+        model = Spot._meta.get_field(relation).related_model
+        names = model.objects.filter(spot=OuterRef('pk')).values(
+            'spot'
+        ).annotate(names=StringAgg('name', ' ')).values('names')
+        vector += SearchVector(
+            Subquery(names, output_field=TextField()),
+            weight='B', config=config
+        )
+
+    return vector
+
+
+def index_spots(**lookups):
+    """Refresh the search vectors of the spots matching lookups"""
+    if uses_search_vector():
+        Spot.objects.filter(**lookups).update(search_vector=spot_vector())
+
+
+def indexed_spot_ids(**lookups):
+    """Return the ids of spots to index later, when vectors are used"""
+    if not uses_search_vector():
+        return []
+
+    return list(Spot.objects.filter(**lookups).values_list('pk', flat=True))
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def trigrams(word):
+    """Return the trigrams of a word padded the way pg_trgm pads them"""
+    padded = f'  {word} '
+
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """In-memory inverted index of the spots of a user
+
+    Used where PostgreSQL text search is not available. Every word of a
+    search must match a word of the spot name, tags or locations exactly or
+    with a trigram similarity of at least the threshold. Spots are ranked
+    by the sum of the best weighted similarity of each word.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.trigrams = {}
+
+    @classmethod
+    def build(cls, user):
+        """Index the spots of a user"""
+        index = cls()
+        for pk, name in Spot.objects.filter(user=user).values_list(
+            'pk', 'name'
+        ):
+            index.add(pk, name, NAME_WEIGHT)
+        for relation in SEARCH_RELATIONS:
+            field = Spot._meta.get_field(relation)
+            for pk, name in field.remote_field.through.objects.filter(**{
+                f'{field.m2m_field_name()}__user': user
+            }).values_list(
+                f'{field.m2m_field_name()}_id',
+                f'{field.m2m_reverse_field_name()}__name'
+            ):
+                index.add(pk, name, RELATED_WEIGHT)
+
+        return index
+
+    def add(self, doc_id, text, weight):
+        for word in tokenize(text):
+            postings = self.postings[word]
+            postings[doc_id] = max(postings.get(doc_id, 0), weight)
+            if word not in self.trigrams:
+                self.trigrams[word] = trigrams(word)
+
+    def match(self, term, threshold):
+        """Return the best score of a search word in each document"""
+        term_trigrams = trigrams(term)
+        scores = {}
+        for word, word_trigrams in self.trigrams.items():
+            if word == term:
+                similarity = 1.0
+            else:
+                similarity = len(term_trigrams & word_trigrams) / \
+                    len(term_trigrams | word_trigrams)
+            if similarity < threshold:
+                continue
+            for doc_id, weight in self.postings[word].items():
+                scores[doc_id] = max(
+                    scores.get(doc_id, 0), weight * similarity
+                )
+
+        return scores
+
+    def search(self, text, threshold):
+        """Return (id, rank) of the matching documents, best first"""
+        ranks = None
+        for term in set(tokenize(text)):
+            scores = self.match(term, threshold)
+            if ranks is None:
+                ranks = scores
+            else:
+                ranks = {
+                    doc_id: rank + scores[doc_id]
+                    for doc_id, rank in ranks.items() if doc_id in scores
+                }
+
+        return sorted(
+            (ranks or {}).items(), key=lambda item: (-item[1], -item[0])
+        )
+
+
+def get_search_index(user):
+    """Return the search index of a user, cached until their data changes"""
+    version = get_version(user.pk)
+    if version is None:
+        return SearchIndex.build(user)
+
+    cache = get_cache()
+    key = f'traveler:search:{user.pk}:{version}'
+    index = cache.get(key)
+    if index is None:
+        index = SearchIndex.build(user)
+        cache.set(key, index, settings.TRAVELER_CACHE_TIMEOUT)
+
+    return index
+
+
+def search_spots(queryset, user, text):
+    """Return the spots of a user matching a search, annotated with rank
+
+    On PostgreSQL the stored vectors are matched with the GIN index, and
+    spot, tag and location names are matched fuzzily with the trigram
+    indexes, so misspelled words that stem differently are still found.
+    Elsewhere the best TRAVELER_SEARCH_MAX_RESULTS spots are ranked.
+    """
+    if not uses_search_vector():
+        ranks = get_search_index(user).search(
+            text, settings.TRAVELER_SEARCH_SIMILARITY
+        )[:settings.TRAVELER_SEARCH_MAX_RESULTS]
+        if not ranks:
+            return queryset.none().annotate(
+                rank=Value(0.0, output_field=FloatField())
+            )
+
+        return queryset.filter(pk__in=[pk for pk, _ in ranks]).annotate(
+            rank=Case(
+                *[When(pk=pk, then=Value(rank)) for pk, rank in ranks],
+                output_field=FloatField()
+            )
+        )
+
+    query = SearchQuery(text, config=settings.TRAVELER_SEARCH_CONFIG)
+    matches = Q(search_vector=query) | Q(name__trigram_similar=text)
+    for relation in SEARCH_RELATIONS:
+        field = Spot._meta.get_field(relation)
+        similar = field.related_model.objects.filter(
+            user=user, name__trigram_similar=text
+        )
+        matches |= Q(pk__in=field.remote_field.through.objects.filter(**{
+            f'{field.m2m_reverse_field_name()}__in': similar
+        }).values(field.m2m_field_name()))
+
+    # ts_rank and similarity are real, cast to double precision so the
+    # rank compares equal to the value encoded in pagination cursors
+    return queryset.filter(matches).annotate(rank=Cast(
+        SearchRank(F('search_vector'), query) +
+        TrigramSimilarity('name', text),
+        FloatField()
+    ))
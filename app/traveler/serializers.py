@@ -1,6 +1,184 @@
+from django.db import models
+from django.db.models import Prefetch
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from core.models import Tag, Location, Spot, location_geohash
+from core.storage import is_private_name
+
+from traveler import bulk
+from traveler.images import variant_urls
+
+
+def to_pk(value):
+    """Return a submitted primary key as an int, or None if invalid"""
+    if bulk.is_id(value):
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
+
+    return None
+
+
+class OwnedManyRelatedField(serializers.ManyRelatedField):
+    """Many-related field resolving all submitted ids with one query
+
+    Ids prefetched by a bulk list serializer are used instead of querying,
+    and every missing id is reported in one error.
+    """
+    default_error_messages = {
+        'does_not_exist': _('Invalid pks {pk_values} - objects do not exist.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = []
+        for value in data:
+            pk = to_pk(value)
+            if pk is None:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(value).__name__
+                )
+            pks.append(pk)
+        pks = list(dict.fromkeys(pks))
+
+        objects = self.context.get('prefetched', {}).get(self.field_name)
+        if objects is None:
+            objects = self.child_relation.get_queryset().in_bulk(pks)
+        missing = [pk for pk in pks if pk not in objects]
+        if missing:
+            self.fail('does_not_exist', pk_values=', '.join(
+                f'"{pk}"' for pk in missing
+            ))
+
+        return [objects[pk] for pk in pks]
+
+
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field accepting only objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return OwnedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """List serializer validating and writing many objects at once
+
+    The ids of the related fields of all items are resolved with one
+    query per field, scoped to the requesting user. Objects are inserted
+    with one bulk insert per table and updated with one CASE update.
+    """
+
+    def related_fields(self):
+        """Return the writable many-related fields of the child"""
+        return {
+            name: field for name, field in self.child.fields.items()
+            if isinstance(field, serializers.ManyRelatedField) and
+            not field.read_only
+        }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+        self.prefetch_related_ids(data)
+        if self.instance is None:
+            return super().to_internal_value(data)
+
+        # Updated items are validated with the instance they update, given
+        # in the same order, as partial updates may depend on its values
+        validated = []
+        errors = []
+        for instance, item in zip(self.instance, data):
+            self.child.instance = instance
+            try:
+                validated.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                errors.append(exc.detail)
+            else:
+                errors.append({})
+        self.child.instance = self.instance
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return validated
+
+    def prefetch_related_ids(self, data):
+        """Load the related objects referenced by any item"""
+        prefetched = {}
+        for name, field in self.related_fields().items():
+            ids = set()
+            for item in data:
+                values = item.get(name) if isinstance(item, dict) else None
+                if isinstance(values, list):
+                    ids.update(to_pk(value) for value in values)
+            ids.discard(None)
+            prefetched[name] = field.child_relation.get_queryset().in_bulk(
+                ids
+            )
+        self.context['prefetched'] = prefetched
+
+    def split_related(self, validated_data):
+        """Pop the many-related values out of each item"""
+        names = self.related_fields()
 
-from core.models import Tag, Location, Spot
+        return [
+            {name: attrs.pop(name) for name in names if name in attrs}
+            for attrs in validated_data
+        ]
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        related = self.split_related(validated_data)
+        instances = bulk.bulk_create(
+            model, [model(**attrs) for attrs in validated_data]
+        )
+        for name in self.related_fields():
+            bulk.bulk_add_related(model, name, {
+                instance: values[name]
+                for instance, values in zip(instances, related)
+                if name in values
+            })
+
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        related = self.split_related(validated_data)
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+            fields.update(attrs)
+        bulk.bulk_update(model, instances, sorted(fields))
+
+        for name in self.related_fields():
+            bulk.bulk_set_related(model, name, {
+                instance: values[name]
+                for instance, values in zip(instances, related)
+                if name in values
+            })
+
+        return instances
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -10,6 +188,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class LocationSerializer(serializers.ModelSerializer):
@@ -17,17 +196,43 @@ class LocationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Location
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'latitude', 'longitude')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
+
+    def validate(self, attrs):
+        """Require coordinates together and index them by geohash
+
+        A partial update giving one coordinate keeps the other one of the
+        location. The geohash is set here rather than only in
+        Location.save(), as bulk writes do not call save().
+        """
+        names = ('latitude', 'longitude')
+        given = [name for name in names if name in attrs]
+        if given and self.partial and self.instance is not None:
+            for name in names:
+                attrs.setdefault(name, getattr(self.instance, name))
+            given = names
+        if len(given) == 1 or given and \
+                (attrs['latitude'] is None) != (attrs['longitude'] is None):
+            raise serializers.ValidationError(
+                'Latitude and longitude must be given together.'
+            )
+        if given:
+            attrs['geohash'] = location_geohash(
+                attrs['latitude'], attrs['longitude']
+            )
+
+        return attrs
 
 
 class SpotSerializer(serializers.ModelSerializer):
     """Serializer a spot"""
-    locations = serializers.PrimaryKeyRelatedField(
+    locations = OwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Location.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = OwnedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -39,18 +244,96 @@ class SpotSerializer(serializers.ModelSerializer):
             'price', 'link',
         )
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
+
+    def update(self, instance, validated_data):
+        """Update a spot, writing only the fields and relations that changed
+
+        Tags and locations are diffed against the current through rows,
+        and the spot row is saved only when something differs, so a no-op
+        PATCH writes nothing and keeps the ETag of the spot.
+        """
+        related = {
+            name: validated_data.pop(name)
+            for name in ('tags', 'locations') if name in validated_data
+        }
+        changed = False
+        for name, objects in related.items():
+            if bulk.bulk_set_related(Spot, name, {instance: objects}):
+                changed = True
+        for attr, value in validated_data.items():
+            if getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                changed = True
+
+        # Saved after the relations so the cache version bump follows them
+        if changed:
+            instance.save()
+
+        return instance
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Prefetch the related ids rendered for each spot"""
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id')),
+            Prefetch('locations', queryset=Location.objects.only('id')),
+        )
+
+
+class PublicImageField(serializers.ImageField):
+    """Image field without a URL for uploads that are not processed yet"""
+
+    def to_representation(self, value):
+        if value and is_private_name(value.name):
+            return None
+
+        return super().to_representation(value)
 
 
 class SpotDetailSerializer(SpotSerializer):
     """Serialize a spot detail object"""
     locations = LocationSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = serializers.SerializerMethodField()
+
+    serializer_field_mapping = {
+        **SpotSerializer.serializer_field_mapping,
+        models.ImageField: PublicImageField,
+    }
+
+    class Meta(SpotSerializer.Meta):
+        fields = SpotSerializer.Meta.fields + (
+            'image', 'image_status', 'image_variants',
+        )
+        read_only_fields = ('id', 'image', 'image_status')
+
+    def get_image_variants(self, spot):
+        return variant_urls(spot, self.context.get('request'))
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Prefetch the nested tags and locations of each spot"""
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+            Prefetch(
+                'locations',
+                queryset=Location.objects.only(
+                    'id', 'name', 'latitude', 'longitude'
+                )
+            ),
+        )
 
 
 class SpotImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to spots"""
+    image_variants = serializers.SerializerMethodField()
+    serializer_field_mapping = SpotDetailSerializer.serializer_field_mapping
 
     class Meta:
         model = Spot
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'image_variants')
+        read_only_fields = ('id', 'image_status')
+
+    def get_image_variants(self, spot):
+        return variant_urls(spot, self.context.get('request'))
@@ -0,0 +1,206 @@
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, FloatField, Func, \
+    IntegerField, Max, Min
+
+from core.models import Spot
+
+from traveler.cache import get_cache, get_version
+
+
+STAT_FIELDS = ('price', 'time_minutes')
+GROUP_RELATIONS = {'tag': 'tags', 'location': 'locations'}
+PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+DEFAULT_BUCKETS = 10
+MAX_BUCKETS = 50
+
+
+class PercentileCont(Aggregate):
+    """Continuous percentile of an ordered group, PostgreSQL only"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = (
+        '%(function)s(%(percentile)s) '
+        'WITHIN GROUP (ORDER BY %(expressions)s)'
+    )
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+class Bucket(Func):
+    """Index of the equal width bucket of lower to upper holding a value
+
+    Values equal to upper fall in an extra last bucket, callers merge it
+    into the one before.
+    """
+    output_field = IntegerField()
+
+    def __init__(self, expression, lower, upper, buckets):
+        super().__init__(expression)
+        self.lower = float(lower)
+        self.upper = float(upper)
+        self.buckets = buckets
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        # Values are at least lower, so truncating is flooring
+        return (
+            f'CAST(({sql} - %s) * %s / %s AS INTEGER)',
+            params + [self.lower, self.buckets, self.upper - self.lower]
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+
+        return (
+            f'(width_bucket({sql}, %s, %s, %s) - 1)',
+            params + [self.lower, self.upper, self.buckets]
+        )
+
+
+def percentile(values, fraction):
+    """Return the percentile of sorted values as PERCENTILE_CONT does"""
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+
+    return values[lower] + (values[upper] - values[lower]) * \
+        (position - lower)
+
+
+def to_float(value):
+    return None if value is None else float(value)
+
+
+def grouped_values(user, group_by):
+    """Return the rows to aggregate, their group column and spot prefix"""
+    if group_by is None:
+        return Spot.objects.filter(user=user), None, ''
+
+    field = Spot._meta.get_field(GROUP_RELATIONS[group_by])
+    rows = field.remote_field.through.objects.filter(**{
+        f'{field.m2m_field_name()}__user': user
+    })
+
+    return rows, field.m2m_reverse_field_name(), \
+        f'{field.m2m_field_name()}__'
+
+
+def compute_spot_stats(user, field, group_by=None, buckets=DEFAULT_BUCKETS):
+    """Aggregate a field of a user's spots, optionally by tag or location
+
+    Counts, averages, extremes and histogram buckets are computed by the
+    database, percentiles too on PostgreSQL. Elsewhere percentiles are
+    computed from the sorted values. Histograms of all groups share the
+    buckets spanning the user's values, so groups can be compared.
+    """
+    rows, group, prefix = grouped_values(user, group_by)
+    column = prefix + field
+    group_fields = [f'{group}_id', f'{group}__name'] if group else []
+
+    aggregates = {
+        'count': Count(column), 'avg': Avg(column),
+        'min': Min(column), 'max': Max(column),
+    }
+    use_percentile_cont = connection.vendor == 'postgresql'
+    if use_percentile_cont:
+        for fraction in PERCENTILES:
+            aggregates[f'p{fraction}'] = PercentileCont(column, fraction)
+    if group:
+        results = list(rows.values(*group_fields).annotate(
+            **aggregates
+        ).order_by(f'{group}__name', f'{group}_id'))
+    else:
+        result = rows.aggregate(**aggregates)
+        results = [result] if result['count'] else []
+
+    groups = []
+    for result in results:
+        groups.append({
+            'id': result[f'{group}_id'] if group else None,
+            'name': result[f'{group}__name'] if group else None,
+            'count': result['count'],
+            'avg': to_float(result['avg']),
+            'min': to_float(result['min']),
+            'max': to_float(result['max']),
+        })
+    if not groups:
+        return {'field': field, 'group_by': group_by, 'groups': []}
+
+    if use_percentile_cont:
+        for stats, result in zip(groups, results):
+            stats['percentiles'] = [
+                {'percentile': fraction,
+                 'value': to_float(result[f'p{fraction}'])}
+                for fraction in PERCENTILES
+            ]
+    else:
+        if group:
+            values = rows.values_list(f'{group}_id', column).order_by(
+                f'{group}_id', column
+            )
+            by_group = {
+                key: [float(value) for _, value in items]
+                for key, items in groupby(values, key=itemgetter(0))
+            }
+        else:
+            by_group = {None: [
+                float(value) for value in
+                rows.values_list(column, flat=True).order_by(column)
+            ]}
+        for stats in groups:
+            stats['percentiles'] = [
+                {'percentile': fraction,
+                 'value': percentile(by_group[stats['id']], fraction)}
+                for fraction in PERCENTILES
+            ]
+
+    lower = min(stats['min'] for stats in groups)
+    upper = max(stats['max'] for stats in groups)
+    if upper == lower:
+        buckets = 1
+    width = (upper - lower) / buckets
+    for stats in groups:
+        stats['histogram'] = [
+            {'lower': lower + width * i,
+             'upper': upper if i == buckets - 1 else lower + width * (i + 1),
+             'count': 0}
+            for i in range(buckets)
+        ]
+    if upper == lower:
+        for stats in groups:
+            stats['histogram'][0]['count'] = stats['count']
+    else:
+        counts = rows.annotate(
+            bucket=Bucket(column, lower, upper, buckets)
+        ).values(*group_fields[:1], 'bucket').annotate(
+            count=Count('*')
+        ).order_by()
+        by_id = {stats['id']: stats for stats in groups}
+        for row in counts:
+            stats = by_id[row[f'{group}_id'] if group else None]
+            bucket = max(0, min(row['bucket'], buckets - 1))
+            stats['histogram'][bucket]['count'] += row['count']
+
+    return {'field': field, 'group_by': group_by, 'groups': groups}
+
+
+def spot_stats(user, field, group_by=None, buckets=DEFAULT_BUCKETS):
+    """Return spot statistics, cached until the user's data changes"""
+    version = get_version(user.pk)
+    if version is None:
+        return compute_spot_stats(user, field, group_by, buckets)
+
+    cache = get_cache()
+    key = f'traveler:stats:{user.pk}:{version}:{field}:{group_by}:{buckets}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_spot_stats(user, field, group_by, buckets)
+        cache.set(key, stats, settings.TRAVELER_CACHE_TIMEOUT)
+
+    return stats
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Location
+
+from traveler.autocomplete import PrefixIndex
+
+
+TAGS_AUTOCOMPLETE_URL = reverse('traveler:tag-autocomplete')
+LOCATIONS_AUTOCOMPLETE_URL = reverse('traveler:location-autocomplete')
+
+
+class PrefixIndexTests(TestCase):
+    """Test the prefix index of names"""
+
+    def test_complete_word_prefixes(self):
+        """Test names are completed from the start of any word"""
+        index = PrefixIndex([
+            (1, 'San Francisco'), (2, 'Santa Cruz'), (3, 'Fresno')
+        ])
+
+        self.assertEqual(index.complete('san', 10),
+                         [(1, 'San Francisco'), (2, 'Santa Cruz')])
+        self.assertEqual(index.complete('fr', 10),
+                         [(1, 'San Francisco'), (3, 'Fresno')])
+        self.assertEqual(index.complete('san fr', 10),
+                         [(1, 'San Francisco')])
+        self.assertEqual(index.complete('x', 10), [])
+
+    def test_complete_normalized(self):
+        """Test case and accents are ignored"""
+        index = PrefixIndex([(1, 'Café Olé')])
+
+        self.assertEqual(index.complete('CAFE', 10), [(1, 'Café Olé')])
+        self.assertEqual(index.complete('ole', 10), [(1, 'Café Olé')])
+
+    def test_complete_limit(self):
+        """Test at most limit names are returned, each once"""
+        index = PrefixIndex([(1, 'Bay Bay'), (2, 'Bay Area'), (3, 'Bayou')])
+
+        self.assertEqual(index.complete('bay', 2),
+                         [(1, 'Bay Bay'), (2, 'Bay Area')])
+        self.assertEqual(index.complete('bay', 5),
+                         [(1, 'Bay Bay'), (2, 'Bay Area'), (3, 'Bayou')])
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class AutocompleteApiTests(TestCase):
+    """Test autocompleting tag and location names"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_autocomplete_tags(self):
+        """Test the user's matching tags are returned"""
+        tag = Tag.objects.create(user=self.user, name='Hiking')
+        Tag.objects.create(user=self.user, name='Beach')
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'password123'
+        )
+        Tag.objects.create(user=other, name='Hills')
+
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'hi'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'Hiking'}])
+
+    def test_autocomplete_without_queries(self):
+        """Test repeated lookups are answered from the index"""
+        Location.objects.create(user=self.user, name='Paris')
+        self.client.get(LOCATIONS_AUTOCOMPLETE_URL, {'q': 'p'})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(LOCATIONS_AUTOCOMPLETE_URL, {'q': 'pa'})
+
+        self.assertEqual(res.data[0]['name'], 'Paris')
+
+    def test_autocomplete_after_write(self):
+        """Test the index is rebuilt once names change"""
+        tag = Tag.objects.create(user=self.user, name='Hiking')
+        self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'hi'})
+
+        tag.name = 'Climbing'
+        tag.save()
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'q': 'cl'})
+
+        self.assertEqual(res.data, [{'id': tag.id, 'name': 'Climbing'}])
+
+    def test_autocomplete_invalid_limit(self):
+        """Test a non integer limit is rejected"""
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL, {'limit': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
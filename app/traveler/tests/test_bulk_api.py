@@ -0,0 +1,211 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+from core.models import Spot, Tag, Location
+
+from traveler.serializers import SpotSerializer
+
+
+TAGS_BULK_URL = reverse('traveler:tag-bulk')
+SPOTS_BULK_URL = reverse('traveler:spot-bulk')
+
+
+def spot_payload(**params):
+    """Return a payload creating a spot"""
+    defaults = {
+        'name': 'Sample spot',
+        'time_minutes': 10,
+        'price': '5.00',
+        'tags': [],
+        'locations': [],
+    }
+    defaults.update(params)
+
+    return defaults
+
+
+class BulkApiTests(TestCase):
+    """Test the bulk create, update and delete endpoints"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating a list of tags"""
+        res = self.client.post(
+            TAGS_BULK_URL, [{'name': 'Surf'}, {'name': 'Swim'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(tag['name'] for tag in res.data), ['Surf', 'Swim']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_spots(self):
+        """Test creating spots with their tags and locations"""
+        tag = Tag.objects.create(user=self.user, name='Surf')
+        location = Location.objects.create(user=self.user, name='Beach')
+        payload = [
+            spot_payload(name='One', tags=[tag.id]),
+            spot_payload(name='Two', locations=[location.id]),
+        ]
+
+        res = self.client.post(SPOTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        one = Spot.objects.get(user=self.user, name='One')
+        two = Spot.objects.get(user=self.user, name='Two')
+        self.assertEqual(list(one.tags.all()), [tag])
+        self.assertEqual(list(two.locations.all()), [location])
+
+    def test_bulk_create_response_order(self):
+        """Test created objects are answered in the order of the items"""
+        res = self.client.post(
+            f'{SPOTS_BULK_URL}?tags=999&search=zzz',
+            [spot_payload(name='a'), spot_payload(name='b')],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([spot['name'] for spot in res.data], ['a', 'b'])
+
+    def test_bulk_validation_prefetches_ids(self):
+        """Test related ids of all items are resolved in one query each"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(5)
+        ]
+        request = Request(APIRequestFactory().post(SPOTS_BULK_URL))
+        request.user = self.user
+        serializer = SpotSerializer(data=[
+            spot_payload(tags=[tag.id]) for tag in tags
+        ], many=True, context={'request': request})
+
+        # No locations are referenced, so only tags are queried
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+
+    def test_bulk_create_per_item_errors(self):
+        """Test invalid items are reported and nothing is written"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'testpass'
+        )
+        tag = Tag.objects.create(user=other, name='Private')
+        payload = [
+            spot_payload(name='Valid'),
+            spot_payload(name='Foreign', tags=[tag.id]),
+            spot_payload(time_minutes='soon'),
+        ]
+
+        res = self.client.post(SPOTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertIn('time_minutes', res.data[2])
+        self.assertFalse(Spot.objects.exists())
+
+    def test_bulk_update_spots(self):
+        """Test updating fields and tags of a list of spots"""
+        tag = Tag.objects.create(user=self.user, name='Surf')
+        spots = [
+            Spot.objects.create(
+                user=self.user, name=name, time_minutes=5, price=5.00
+            )
+            for name in ('One', 'Two')
+        ]
+        spots[0].tags.add(tag)
+        payload = [
+            {'id': spots[0].id, 'name': 'First', 'tags': []},
+            {'id': spots[1].id, 'tags': [tag.id]},
+        ]
+
+        res = self.client.patch(SPOTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for spot in spots:
+            spot.refresh_from_db()
+        self.assertEqual(spots[0].name, 'First')
+        self.assertEqual(spots[1].name, 'Two')
+        self.assertEqual(list(spots[0].tags.all()), [])
+        self.assertEqual(list(spots[1].tags.all()), [tag])
+
+    def test_bulk_update_unknown_ids(self):
+        """Test updating missing or duplicate ids reports per-item errors"""
+        tag = Tag.objects.create(user=self.user, name='Surf')
+        payload = [
+            {'id': tag.id, 'name': 'Swim'},
+            {'id': tag.id, 'name': 'Sail'},
+            {'id': tag.id + 100, 'name': 'Dive'},
+            {'name': 'Row'},
+        ]
+
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(len([error for error in res.data if error]), 3)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Surf')
+
+    def test_bulk_delete_tags(self):
+        """Test deleting a list of owned tags"""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Surf', 'Swim')
+        ]
+
+        res = self.client.delete(
+            TAGS_BULK_URL, [tag.id for tag in tags], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_delete_queries_constant(self):
+        """Test deleted tags are not handled one by one"""
+        spot = Spot.objects.create(
+            user=self.user, name='Cafe', time_minutes=5, price=5.00
+        )
+        counts = []
+        for size in (2, 20):
+            tags = [
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+                for i in range(size)
+            ]
+            spot.tags.set(tags)
+            updated_at = Spot.objects.get(pk=spot.pk).updated_at
+
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(
+                    TAGS_BULK_URL, [tag.id for tag in tags], format='json'
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            self.assertFalse(spot.tags.exists())
+            self.assertGreater(
+                Spot.objects.get(pk=spot.pk).updated_at, updated_at
+            )
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bulk_requires_list(self):
+        """Test a bulk request body must be a list"""
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Surf'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Spot, Tag
+
+from traveler.cache import get_version, normalize_param
+
+
+TAGS_URL = reverse('traveler:tag-list')
+SPOTS_URL = reverse('traveler:spot-list')
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class CachedListApiTests(TestCase):
+    """Test the cached traveler list responses"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not query the database"""
+        Tag.objects.create(user=self.user, name='Social')
+        res = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(TAGS_URL)
+
+        self.assertEqual(cached.data, res.data)
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_list_not_cached_in_local_memory(self):
+        """Test responses are not cached in a per process cache"""
+        Tag.objects.create(user=self.user, name='Social')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('ETag', res)
+
+    def test_create_invalidates_cache(self):
+        """Test creating a tag bumps the version of its owner"""
+        self.client.get(TAGS_URL)
+        version = get_version(self.user.pk)
+
+        self.client.post(TAGS_URL, {'name': 'Social'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertGreater(get_version(self.user.pk), version)
+        self.assertEqual(len(res.data), 1)
+
+    def test_m2m_change_invalidates_cache(self):
+        """Test assigning a tag to a spot refreshes filtered spot lists"""
+        tag = Tag.objects.create(user=self.user, name='Social')
+        spot = Spot.objects.create(
+            user=self.user, name='Cafe', time_minutes=5, price=5.00
+        )
+        res = self.client.get(SPOTS_URL, {'tags': f'{tag.id}'})
+        self.assertEqual(len(res.data), 0)
+
+        spot.tags.add(tag)
+        res = self.client.get(SPOTS_URL, {'tags': f'{tag.id}'})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_etag_not_modified(self):
+        """Test an unchanged list answers If-None-Match with a 304"""
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+        Tag.objects.create(user=self.user, name='Social')
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_equivalent_params_share_key(self):
+        """Test reordered and repeated ids hit the same cached response"""
+        first = self.client.get(SPOTS_URL, {'tags': '2,1'})
+        second = self.client.get(SPOTS_URL, {'tags': '1,2,1'})
+
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(normalize_param('3, 1,1'), '1,3')
+        self.assertEqual(normalize_param('\u00b2'), '\u00b2')
+
+        res = self.client.get(SPOTS_URL, {'tags': '\u00b2'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_points_not_normalized(self):
+        """Test near points are not mistaken for id lists"""
+        first = self.client.get(SPOTS_URL, {'near': '48,2'})
+        second = self.client.get(SPOTS_URL, {'near': '2,48'})
+        third = self.client.get(SPOTS_URL, {'near': '10,10'})
+        fourth = self.client.get(SPOTS_URL, {'near': '10'})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(fourth.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
@@ -0,0 +1,180 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import geohash
+from core.models import Location, Spot
+
+
+LOCATIONS_URL = reverse('traveler:location-list')
+NEAREST_LOCATIONS_URL = reverse('traveler:location-nearest')
+SPOTS_URL = reverse('traveler:spot-list')
+NEAREST_SPOTS_URL = reverse('traveler:spot-nearest')
+
+PARIS = '48.8566,2.3522'
+
+
+class NearbyApiTests(TestCase):
+    """Test finding locations and spots by distance"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.louvre = self.location('Louvre', 48.8606, 2.3376)
+        self.versailles = self.location('Versailles', 48.8049, 2.1204)
+        self.london = self.location('London', 51.5074, -0.1278)
+        self.location('Nowhere')
+
+    def location(self, name, latitude=None, longitude=None):
+        return Location.objects.create(
+            user=self.user, name=name, latitude=latitude, longitude=longitude
+        )
+
+    def spot(self, name, *locations):
+        spot = Spot.objects.create(
+            user=self.user, name=name, time_minutes=10, price=5.00
+        )
+        spot.locations.add(*locations)
+
+        return spot
+
+    def test_save_sets_geohash(self):
+        """Test saving coordinates indexes them by geohash"""
+        self.assertEqual(len(self.louvre.geohash), 9)
+        self.assertEqual(Location.objects.get(name='Nowhere').geohash, '')
+
+    def test_locations_near(self):
+        """Test locations within a radius are listed nearest first"""
+        res = self.client.get(LOCATIONS_URL, {'near': PARIS, 'radius': 50})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([location['name'] for location in res.data],
+                         ['Louvre', 'Versailles'])
+
+        res = self.client.get(LOCATIONS_URL, {'near': PARIS, 'radius': 2})
+
+        self.assertEqual([location['name'] for location in res.data],
+                         ['Louvre'])
+
+    def test_locations_near_paginated(self):
+        """Test pages near a point follow on from each other by distance"""
+        names = []
+        url = LOCATIONS_URL
+        params = {'near': PARIS, 'radius': 500, 'page_size': 1}
+        while url:
+            res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            names += [location['name'] for location in res.data['results']]
+            url, params = res.data['next'], None
+
+        self.assertEqual(names, ['Louvre', 'Versailles', 'London'])
+
+    def test_many_locations_near(self):
+        """Test only the ids of the page near a point are queried"""
+        Location.objects.bulk_create([
+            Location(user=self.user, name=f'Cafe {i}',
+                     latitude=48.8566, longitude=2.3522 + i / 100000,
+                     geohash=geohash.encode(48.8566, 2.3522 + i / 100000))
+            for i in range(1500)
+        ])
+
+        res = self.client.get(
+            LOCATIONS_URL, {'near': PARIS, 'radius': 50, 'page_size': 3}
+        )
+
+        self.assertEqual([location['name'] for location in res.data[
+            'results']], ['Cafe 0', 'Cafe 1', 'Cafe 2'])
+        res = self.client.get(LOCATIONS_URL, {'near': PARIS, 'radius': 50})
+        self.assertEqual(len(res.data), 1502)
+        self.assertEqual(res.data[-1]['name'], 'Versailles')
+
+    def test_nearest_locations(self):
+        """Test the k nearest locations are returned with distances"""
+        res = self.client.get(NEAREST_LOCATIONS_URL, {'near': PARIS, 'k': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([location['name'] for location in res.data],
+                         ['Louvre', 'Versailles', 'London'])
+        self.assertAlmostEqual(res.data[2]['distance'], 343.5, delta=1)
+
+    def test_spots_near(self):
+        """Test spots are found through their nearest location"""
+        self.spot('Museum', self.louvre, self.london)
+        self.spot('Palace', self.versailles)
+        self.spot('Bridge', self.london)
+
+        res = self.client.get(SPOTS_URL, {'near': PARIS, 'radius': 30})
+
+        self.assertEqual([spot['name'] for spot in res.data],
+                         ['Museum', 'Palace'])
+
+        res = self.client.get(NEAREST_SPOTS_URL, {'near': PARIS, 'k': 1})
+
+        self.assertEqual(res.data[0]['name'], 'Museum')
+        self.assertLess(res.data[0]['distance'], 2)
+
+    def test_near_invalid(self):
+        """Test invalid points and radii are rejected"""
+        for params in ({'near': '91,0'}, {'near': 'paris'},
+                       {'near': PARIS, 'radius': -1}):
+            res = self.client.get(LOCATIONS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(NEAREST_SPOTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_coordinates_given_together(self):
+        """Test a latitude without a longitude is rejected"""
+        res = self.client.post(
+            LOCATIONS_URL, {'name': 'Half', 'latitude': 10}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partial_update_one_coordinate(self):
+        """Test patching a latitude keeps the location's longitude"""
+        res = self.client.patch(
+            reverse('traveler:location-bulk'),
+            [{'id': self.louvre.id, 'latitude': 48.8584}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.louvre.refresh_from_db()
+        self.assertEqual(self.louvre.latitude, 48.8584)
+        self.assertEqual(self.louvre.longitude, 2.3376)
+        self.assertEqual(
+            self.louvre.geohash, geohash.encode(48.8584, 2.3376)
+        )
+
+    def test_partial_update_without_coordinates_rejected(self):
+        """Test a location without coordinates needs both of them"""
+        nowhere = Location.objects.get(name='Nowhere')
+        res = self.client.patch(
+            reverse('traveler:location-bulk'),
+            [{'id': nowhere.id, 'latitude': 10}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_sets_geohash(self):
+        """Test locations created in bulk are indexed too"""
+        res = self.client.post(
+            reverse('traveler:location-bulk'),
+            [{'name': 'Eiffel Tower', 'latitude': 48.8584,
+              'longitude': 2.2945}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        location = Location.objects.get(name='Eiffel Tower')
+        self.assertTrue(location.geohash.startswith('u09t'))
@@ -1,14 +1,24 @@
 from graphene_django.utils.testing import GraphQLTestCase
 from graphene.test import Client
+from graphql.utils.introspection_query import introspection_query
 
 from app.schema import schema
 
 from django.contrib.auth import get_user_model
-from django.test import RequestFactory
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
+from rest_framework.test import APIClient
 
-from core.models import Spot
+from core.models import Spot, Tag, Location
+
+from traveler.complexity import execute_with_limits
+from traveler.documents import CachedDocumentBackend, query_hash
+
+
+GRAPHQL_URL = '/graphql/'
 
 
 def sample_spot(user, **params):
@@ -64,14 +74,359 @@ class privateGraphQLApiTests(GraphQLTestCase):
 
         client = Client(schema)
         executed = client.execute(
-            '''{ allSpots { name } } ''', context=request
+            '''{ allSpots { edges { node { name } } } } ''', context=request
         )
 
         self.assertIn('data', executed)
         data = executed.get('data')
 
         self.assertIn('allSpots', data)
-        allSpots = data.get('allSpots')
+        allSpots = data.get('allSpots').get('edges')
+
+        self.assertEqual(allSpots[0]['node'].get('name'), "Sample spot")
+        self.assertEqual(allSpots[1]['node'].get('name'), "Sample spot")
+
+    def test_allspots_limited_to_user(self):
+        """Test that only the authenticated user's spots are returned"""
+        user2 = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpass'
+        )
+        sample_spot(user=user2, name='Other spot')
+        sample_spot(user=self.user)
+
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        client = Client(schema)
+        executed = client.execute(
+            '''{ allSpots { edges { node { name } } } } ''', context=request
+        )
+
+        self.assertEqual(executed['data']['allSpots']['edges'], [
+            {'node': {'name': 'Sample spot'}}
+        ])
+
+    def test_spot_limited_to_user(self):
+        """Test spots of other users cannot be read by id or name"""
+        user2 = get_user_model().objects.create_user(
+            'test2@gmail.com',
+            'testpass'
+        )
+        other = sample_spot(user=user2, name='Shared name')
+        sample_spot(user=self.user, name='Shared name')
+
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        client = Client(schema)
+        executed = client.execute(
+            f'''{{
+                byId: spot(id: {other.id}) {{ name }}
+                byName: spot(name: "Shared name") {{ user {{ id }} }}
+            }}''',
+            context=request
+        )
+
+        self.assertIsNone(executed['data']['byId'])
+        self.assertEqual(executed['data']['byName'], {
+            'user': {'id': str(self.user.id)}
+        })
+
+    def test_allspots_paginated(self):
+        """Test paging through spots with first and after"""
+        for name in ('Spot 1', 'Spot 2', 'Spot 3'):
+            sample_spot(user=self.user, name=name)
+
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        client = Client(schema)
+        query = '''query ($after: String) {
+            allSpots(first: 2, after: $after) {
+                edges { node { name } }
+                pageInfo { hasNextPage endCursor }
+            }
+        }'''
+        executed = client.execute(query, context=request)
+
+        page = executed['data']['allSpots']
+        self.assertEqual(
+            [edge['node']['name'] for edge in page['edges']],
+            ['Spot 1', 'Spot 2']
+        )
+        self.assertTrue(page['pageInfo']['hasNextPage'])
+
+        executed = client.execute(
+            query,
+            context=request,
+            variables={'after': page['pageInfo']['endCursor']}
+        )
+
+        page = executed['data']['allSpots']
+        self.assertEqual(
+            [edge['node']['name'] for edge in page['edges']],
+            ['Spot 3']
+        )
+        self.assertFalse(page['pageInfo']['hasNextPage'])
+
+    def test_allspots_relations_batched(self):
+        """Test nested spot relations run a fixed number of queries"""
+        tag = Tag.objects.create(user=self.user, name='Surf')
+        location = Location.objects.create(user=self.user, name='Hawaii')
+        for i in range(5):
+            spot = sample_spot(user=self.user)
+            spot.tags.add(tag)
+            spot.locations.add(location)
+
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        client = Client(schema)
+        with self.assertNumQueries(4):
+            executed = client.execute(
+                '''{ allSpots { edges { node {
+                    name
+                    user { name }
+                    tags { name }
+                    locations { name spotSet { name } }
+                } } } }''',
+                context=request
+            )
+
+        self.assertNotIn('errors', executed)
+        allSpots = [
+            edge['node'] for edge in executed['data']['allSpots']['edges']
+        ]
+        self.assertEqual(len(allSpots), 5)
+        self.assertEqual(allSpots[0]['tags'], [{'name': 'Surf'}])
+        self.assertEqual(len(allSpots[0]['locations'][0]['spotSet']), 5)
+
+    def test_allspots_loads_selected_columns(self):
+        """Test only the selected spot columns are loaded"""
+        sample_spot(user=self.user, link='https://example.com')
+
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        client = Client(schema)
+        with CaptureQueriesContext(connection) as queries:
+            executed = client.execute(
+                '''{ allSpots { edges { node { ...spotFields } } } }
+                fragment spotFields on SpotType { name priceRating }''',
+                context=request
+            )
+
+        self.assertEqual(executed['data']['allSpots']['edges'], [
+            {'node': {'name': 'Sample spot', 'priceRating': 'Expensive'}}
+        ])
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"core_spot"."price"', queries[0]['sql'])
+        self.assertNotIn('"core_spot"."link"', queries[0]['sql'])
+        self.assertNotIn('"core_spot"."image"', queries[0]['sql'])
+
+
+class GraphQLDocumentCacheTests(TestCase):
+    """Test caching parsed GraphQL documents"""
+
+    def test_document_parsed_once(self):
+        """Test a repeated query is served from the cache"""
+        backend = CachedDocumentBackend(max_size=2)
+        query = '{ spot(id: 1) { name } }'
+        document = backend.document_from_string(schema, query)
+
+        self.assertIs(backend.document_from_string(schema, query), document)
+        self.assertIs(
+            backend.get_document(schema, query_hash(query)), document
+        )
+        self.assertEqual(backend.cache.hits, 2)
+        self.assertEqual(backend.cache.misses, 1)
+
+    def test_document_cache_evicts_least_recently_used(self):
+        """Test the cache holds at most max_size documents"""
+        backend = CachedDocumentBackend(max_size=2)
+        queries = [f'{{ spot(id: {i}) {{ name }} }}' for i in range(3)]
+        backend.document_from_string(schema, queries[0])
+        backend.document_from_string(schema, queries[1])
+        backend.document_from_string(schema, queries[0])
+        backend.document_from_string(schema, queries[2])
+
+        self.assertEqual(len(backend.cache), 2)
+        self.assertEqual(backend.cache.evictions, 1)
+        self.assertIsNone(backend.get_document(schema, query_hash(queries[1])))
+
+    def test_invalid_document_cached_with_errors(self):
+        """Test validation errors are returned without revalidating"""
+        backend = CachedDocumentBackend()
+        document = backend.document_from_string(schema, '{ missing }')
+        result = document.execute()
+
+        self.assertTrue(result.invalid)
+        self.assertEqual(len(result.errors), 1)
+
+
+class QueryComplexityTests(TestCase):
+    """Test the cost and depth limits of GraphQL queries"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+
+    def execute(self, query, max_cost=1000, max_depth=10, **kwargs):
+        document = CachedDocumentBackend().document_from_string(
+            schema, query
+        )
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        return execute_with_limits(
+            schema, document.document_ast, max_cost, max_depth, 20,
+            context_value=request, **kwargs
+        )
+
+    def test_query_cost_reported(self):
+        """Test the cost of a query multiplies list selections"""
+        result = self.execute(
+            '''query ($first: Int) {
+                allSpots(first: $first) { edges { node { name } } }
+            }''',
+            variable_values={'first': 5}
+        )
+
+        self.assertIsNone(result.errors)
+        # allSpots + 5 * (edges + node + name)
+        self.assertEqual(result.extensions['cost']['requested'], 16)
+        self.assertEqual(result.extensions['cost']['depth'], 4)
+
+    def test_query_cost_exceeded(self):
+        """Test queries over the cost budget are not executed"""
+        sample_spot(user=self.user)
+        query = '''{
+            a: allSpots { edges { node { tags { name } } } }
+            b: allSpots { edges { node { tags { name } } } }
+        }'''
+        with self.assertNumQueries(0):
+            result = self.execute(query, max_cost=500)
+
+        self.assertTrue(result.invalid)
+        self.assertIn('exceeds the maximum', result.errors[0].message)
+        self.assertGreater(result.extensions['cost']['requested'], 500)
+
+    def test_query_cost_weighted(self):
+        """Test expensive fields are rejected where cheap ones pass"""
+        cheap = self.execute(
+            '''{
+                a: allSpots(first: 1) { edges { node { name } } }
+                b: allSpots(first: 1) { edges { node { name } } }
+            }''',
+            max_cost=50
+        )
+        expensive = self.execute(
+            '''{
+                a: searchSpots(query: "x", first: 1) {
+                    edges { node { name } }
+                }
+                b: searchSpots(query: "x", first: 1) {
+                    edges { node { name } }
+                }
+            }''',
+            max_cost=50
+        )
+
+        self.assertIsNone(cheap.errors)
+        # 2 * (allSpots + edges + node + name)
+        self.assertEqual(cheap.extensions['cost']['requested'], 8)
+        self.assertTrue(expensive.invalid)
+        # 2 * (50 for searchSpots + edges + node + name)
+        self.assertEqual(expensive.extensions['cost']['requested'], 106)
+
+    def test_query_depth_exceeded(self):
+        """Test queries nested too deeply are rejected"""
+        result = self.execute(
+            '''{ allSpots { edges { node { locations { spotSet {
+                locations { name }
+            } } } } } }''',
+            max_depth=5
+        )
+
+        self.assertTrue(result.invalid)
+        self.assertIn('depth 7', result.errors[0].message)
+
+    def test_introspection_counted(self):
+        """Test introspection fields cost a fixed amount and have no depth"""
+        result = self.execute(
+            '''{ __schema { types { fields { type { fields {
+                type { name }
+            } } } } } }''',
+            max_cost=5
+        )
+
+        self.assertTrue(result.invalid)
+        # One per field selected, lists are not multiplied
+        self.assertEqual(result.extensions['cost']['requested'], 7)
+        self.assertEqual(result.extensions['cost']['depth'], 0)
+        self.assertEqual(len(result.errors), 1)
+
+    def test_introspection_query_allowed(self):
+        """Test the introspection query fits the default budget"""
+        document = CachedDocumentBackend().document_from_string(
+            schema, introspection_query
+        )
+        request = self.factory.get('graphql/')
+        request.user = self.user
+
+        result = document.execute(context_value=request)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.extensions['cost']['depth'], 0)
+
+
+class PersistedQueryApiTests(TestCase):
+    """Test persisted queries on the graphql endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def post(self, **payload):
+        return self.client.post(GRAPHQL_URL, payload, format='json')
+
+    def test_persisted_query_flow(self):
+        """Test registering and then running a persisted query"""
+        sample_spot(user=self.user)
+        query = '{ allSpots { edges { node { name timeMinutes } } } }'
+        extensions = {'persistedQuery': {
+            'version': 1, 'sha256Hash': query_hash(query)
+        }}
+
+        res = self.post(extensions=extensions)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json()['errors'][0]['message'], 'PersistedQueryNotFound'
+        )
+
+        self.post(query=query, extensions=extensions)
+        res = self.post(extensions=extensions)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['data']['allSpots']['edges'], [
+            {'node': {'name': 'Sample spot', 'timeMinutes': 60}}
+        ])
+        self.assertIn('cost', res.json()['extensions'])
+
+    def test_persisted_query_hash_mismatch(self):
+        """Test a query not matching its hash is rejected"""
+        res = self.post(
+            query='{ allSpots { edges { node { name } } } }',
+            extensions={'persistedQuery': {'sha256Hash': 'abc'}}
+        )
 
-        self.assertEqual(allSpots[0].get('name'), "Sample spot")
-        self.assertEqual(allSpots[1].get('name'), "Sample spot")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import struct
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from core.models import Spot
+
+from traveler.images import ImageWorkerPool, collect_image, \
+    encode_image, open_image, process_spot_image, variant_names
+
+
+def exif_orientation(orientation):
+    """Return an EXIF block holding only an orientation tag"""
+    # Little endian TIFF header, then one IFD entry of a SHORT value
+    return b'Exif\x00\x00II*\x00' + struct.pack(
+        '<IHHHIHHI', 8, 1, 274, 3, 1, orientation, 0, 0
+    )
+
+
+def image_content(size=(1600, 800), orientation=None, image_format='JPEG'):
+    """Return the bytes of a sample image"""
+    image = Image.new('RGB', size, (200, 30, 30))
+    options = {}
+    if orientation is not None:
+        options['exif'] = exif_orientation(orientation)
+    content = BytesIO()
+    image.save(content, format=image_format, **options)
+
+    return content.getvalue()
+
+
+class SpotImageProcessingTests(TestCase):
+    """Test processing uploaded spot images"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+        self.spot = Spot.objects.create(
+            user=self.user, name='Cliffs', time_minutes=5, price=5.00
+        )
+
+    def tearDown(self):
+        if self.spot.image:
+            storage = self.spot.image.storage
+            for names in variant_names(self.spot.image.name).values():
+                for name in names.values():
+                    storage.delete(name)
+            self.spot.image.delete()
+
+    def upload(self, content):
+        self.spot.image.save('photo.jpg', ContentFile(content))
+        self.spot.image_status = Spot.IMAGE_PENDING
+        self.spot.save()
+
+    def test_process_creates_variants(self):
+        """Test resized variants are stored and exposed once ready"""
+        self.upload(image_content())
+
+        process_spot_image(self.spot.id, self.spot.image.name)
+
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.image_status, Spot.IMAGE_READY)
+        thumbnail = variant_names(self.spot.image.name)['thumbnail']['jpg']
+        with Image.open(self.spot.image.storage.path(thumbnail)) as image:
+            self.assertEqual(image.size, (200, 100))
+
+        self.assertEqual(self.spot.image_formats.split(',')[0], 'jpg')
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        storage_class = type(self.spot.image.storage)
+        with patch.object(storage_class, 'exists') as exists:
+            res = client.get(
+                reverse('traveler:spot-detail', args=[self.spot.id])
+            )
+        exists.assert_not_called()
+        self.assertEqual(res.data['image_status'], Spot.IMAGE_READY)
+        self.assertTrue(res.data['image_variants']['medium']['jpg'].endswith(
+            os.path.basename(variant_names(self.spot.image.name)['medium'][
+                'jpg'])
+        ))
+
+    def test_process_strips_metadata(self):
+        """Test EXIF is dropped after turning the image upright"""
+        self.upload(image_content(size=(40, 20), orientation=6))
+
+        process_spot_image(self.spot.id, self.spot.image.name)
+
+        self.spot.refresh_from_db()
+        with Image.open(self.spot.image.path) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertNotIn('exif', image.info)
+
+    def test_process_shares_identical_copies(self):
+        """Test uploads that strip to the same image share one copy"""
+        self.upload(image_content(orientation=1))
+        process_spot_image(self.spot.id, self.spot.image.name)
+        other = Spot.objects.create(
+            user=self.user, name='Bay', time_minutes=5, price=5.00
+        )
+        other.image.save('photo.jpg', ContentFile(image_content()))
+        other.save()
+
+        process_spot_image(other.id, other.image.name)
+
+        self.spot.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(other.image.name, self.spot.image.name)
+        self.assertEqual(
+            os.path.dirname(os.path.dirname(self.spot.image.name)),
+            'uploads/spot'
+        )
+
+    def test_process_invalid_image(self):
+        """Test an undecodable image is marked as failed and removed"""
+        self.upload(b'not an image')
+        name = self.spot.image.name
+
+        with self.assertLogs('traveler.images', 'WARNING'):
+            process_spot_image(self.spot.id, name)
+
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.image_status, Spot.IMAGE_FAILED)
+        self.assertFalse(self.spot.image)
+        self.assertFalse(self.spot.image.storage.exists(name))
+
+    def test_process_failure_collects_copy(self):
+        """Test a copy stored before processing fails is removed"""
+        content = image_content()
+        self.upload(content)
+        storage = self.spot.image.storage
+        stripped = storage.content_name(
+            'uploads/spot/photo.jpg',
+            hashlib.sha256(encode_image(*open_image(content)).read())
+            .hexdigest()
+        )
+
+        with patch.object(Image.Image, 'thumbnail',
+                          side_effect=OSError('disk full')), \
+                self.assertLogs('traveler.images', 'WARNING'):
+            process_spot_image(self.spot.id, self.spot.image.name)
+
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.image_status, Spot.IMAGE_FAILED)
+        self.assertFalse(storage.exists(stripped))
+
+    def test_process_replaced_image(self):
+        """Test a task for an image that was replaced does nothing"""
+        self.upload(image_content())
+        name = self.spot.image.name
+        self.upload(image_content(size=(800, 400)))
+
+        process_spot_image(self.spot.id, name)
+
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.image_status, Spot.IMAGE_PENDING)
+        os.remove(self.spot.image.storage.path(name))
+
+    def test_process_collects_upload(self):
+        """Test the original upload is deleted once replaced by its copy"""
+        self.upload(image_content())
+        name = self.spot.image.name
+
+        process_spot_image(self.spot.id, name)
+
+        self.spot.refresh_from_db()
+        self.assertNotEqual(self.spot.image.name, name)
+        self.assertFalse(self.spot.image.storage.exists(name))
+
+    def test_collect_shared_image(self):
+        """Test an image is only deleted once no spot references it"""
+        self.upload(image_content())
+        name = self.spot.image.name
+        other = Spot.objects.create(
+            user=self.user, name='Bay', time_minutes=5, price=5.00,
+            image=name
+        )
+        storage = self.spot.image.storage
+
+        self.assertFalse(collect_image(name))
+        self.assertTrue(storage.exists(name))
+
+        other.delete()
+        Spot.objects.filter(pk=self.spot.pk).update(image='')
+        self.assertTrue(collect_image(name))
+        self.assertFalse(storage.exists(name))
+        self.spot.refresh_from_db()
+
+    def test_collect_leased_image(self):
+        """Test an image reused by an uncommitted save is not deleted"""
+        self.upload(image_content())
+        name = self.spot.image.name
+        Spot.objects.filter(pk=self.spot.pk).update(image='')
+        storage = self.spot.image.storage
+
+        directory = os.path.dirname(os.path.dirname(name))
+        self.assertEqual(storage.save(
+            os.path.join(directory, 'again.jpg'),
+            ContentFile(image_content())
+        ), name)
+
+        self.assertFalse(collect_image(name))
+        self.assertTrue(storage.exists(name))
+
+
+class ImageWorkerPoolTests(TestCase):
+    """Test running image tasks"""
+
+    def test_inline_failure_logged(self):
+        """Test a task failing inline is logged rather than raised"""
+        def fail():
+            raise OSError('disk full')
+
+        with self.assertLogs('traveler.images', 'ERROR'):
+            self.assertIsNone(ImageWorkerPool(0).submit(fail))
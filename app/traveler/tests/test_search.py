@@ -0,0 +1,209 @@
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from graphene.test import Client
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.schema import schema
+from core.models import Spot, Tag, Location
+
+from traveler.search import SearchIndex, trigrams, uses_search_vector
+
+
+SPOTS_URL = reverse('traveler:spot-list')
+
+
+def sample_spot(user, **params):
+    """Create and return a sample spot"""
+    defaults = {
+        'name': 'Sample spot',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Spot.objects.create(user=user, **defaults)
+
+
+class SearchIndexTests(TestCase):
+    """Test the in-memory search index"""
+
+    def test_trigrams_padded(self):
+        """Test words are padded like pg_trgm pads them"""
+        self.assertEqual(trigrams('cat'), {'  c', ' ca', 'cat', 'at '})
+
+    def test_search_ranks_weighted_matches(self):
+        """Test every word must match and better matches rank first"""
+        index = SearchIndex()
+        index.add(1, 'Golden Gate Bridge', 1.0)
+        index.add(2, 'Bay Bridge', 1.0)
+        index.add(2, 'Golden', 0.4)
+        index.add(3, 'Golden Hour', 1.0)
+
+        self.assertEqual(
+            [doc_id for doc_id, _ in index.search('golden bridge', 0.3)],
+            [1, 2]
+        )
+
+    def test_search_fuzzy(self):
+        """Test misspelled words match similar words"""
+        index = SearchIndex()
+        index.add(1, 'Waterfall', 1.0)
+
+        self.assertEqual([doc_id for doc_id, _ in index.search(
+            'waterfal', 0.3
+        )], [1])
+        self.assertEqual(index.search('mountain', 0.3), [])
+
+
+class SpotSearchApiTests(TestCase):
+    """Test searching spots through the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, text, **params):
+        return self.client.get(SPOTS_URL, {'search': text, **params})
+
+    def test_search_names_tags_and_locations(self):
+        """Test spots are found by name, tag and location, best first"""
+        beach = Tag.objects.create(user=self.user, name='Beach')
+        sample_spot(self.user, name='Hidden beach')
+        tagged = sample_spot(self.user, name='Cove')
+        tagged.tags.add(beach)
+        located = sample_spot(self.user, name='Pier')
+        located.locations.add(
+            Location.objects.create(user=self.user, name='Beach Town')
+        )
+        sample_spot(self.user, name='Museum')
+
+        res = self.search('beach')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Hidden beach')
+        self.assertEqual(
+            {spot['name'] for spot in res.data[1:]}, {'Cove', 'Pier'}
+        )
+
+    def test_search_fuzzy(self):
+        """Test misspelled searches still find spots"""
+        sample_spot(self.user, name='Waterfall trail')
+
+        res = self.search('waterfal')
+
+        self.assertEqual([spot['name'] for spot in res.data],
+                         ['Waterfall trail'])
+
+    @override_settings(TRAVELER_SEARCH_MAX_RESULTS=2)
+    def test_search_results_capped(self):
+        """Test the in-memory index only ranks the best spots"""
+        if uses_search_vector():
+            self.skipTest('Only the in-memory index is capped')
+        for name in ('Beach', 'Beach bar', 'Beach cafe'):
+            sample_spot(self.user, name=name)
+
+        res = self.search('beach')
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_search_only_own_spots(self):
+        """Test other users' spots are never found"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'testpass'
+        )
+        sample_spot(other, name='Lighthouse')
+
+        res = self.search('lighthouse')
+
+        self.assertEqual(res.data, [])
+
+    def test_search_follows_renamed_tag(self):
+        """Test renaming a tag changes the spots it finds"""
+        tag = Tag.objects.create(user=self.user, name='Hiking')
+        spot = sample_spot(self.user, name='Ridge')
+        spot.tags.add(tag)
+        self.assertEqual(len(self.search('hiking').data), 1)
+
+        tag.name = 'Climbing'
+        tag.save()
+
+        self.assertEqual(self.search('hiking').data, [])
+        self.assertEqual(len(self.search('climbing').data), 1)
+
+    def test_search_paginated(self):
+        """Test ranked results are paginated with cursors"""
+        for i in range(3):
+            sample_spot(self.user, name=f'Garden {i}')
+
+        first = self.search('garden', page_size=2)
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual(len(first.data['results']), 2)
+        self.assertEqual(len(second.data['results']), 1)
+        self.assertIsNone(second.data['next'])
+        names = {spot['name'] for spot in first.data['results']}
+        names.add(second.data['results'][0]['name'])
+        self.assertEqual(len(names), 3)
+
+    def test_search_too_long(self):
+        """Test overly long searches are rejected"""
+        res = self.search('x' * 201)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchSpotsGraphQLTests(TestCase):
+    """Test the searchSpots GraphQL field"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+        self.request = RequestFactory().get('/graphql/')
+        self.request.user = self.user
+
+    def execute(self, **variables):
+        return Client(schema).execute(
+            '''query ($query: String!, $first: Int, $after: String) {
+                searchSpots(query: $query, first: $first, after: $after) {
+                    edges { node { name } }
+                    pageInfo { hasNextPage endCursor }
+                }
+            }''',
+            context_value=self.request, variable_values=variables
+        )
+
+    def test_search_spots(self):
+        """Test ranked pages of matching spots are returned"""
+        sample_spot(self.user, name='Old harbor')
+        sample_spot(self.user, name='New harbor')
+        sample_spot(self.user, name='Forest')
+
+        result = self.execute(query='harbor', first=1)
+        page = result['data']['searchSpots']
+        self.assertTrue(page['pageInfo']['hasNextPage'])
+
+        result = self.execute(
+            query='harbor', first=1, after=page['pageInfo']['endCursor']
+        )
+        next_page = result['data']['searchSpots']
+        self.assertFalse(next_page['pageInfo']['hasNextPage'])
+        self.assertEqual(
+            {edge['node']['name']
+             for edge in page['edges'] + next_page['edges']},
+            {'Old harbor', 'New harbor'}
+        )
+
+    def test_search_spots_invalid_cursor(self):
+        """Test a cursor from another connection is rejected"""
+        result = self.execute(query='harbor', after='bm9wZQ==')
+
+        self.assertEqual(result['errors'][0]['message'], 'Invalid cursor')
@@ -1,14 +1,18 @@
+import base64
 import tempfile
 import os
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
 from core.models import Spot, Tag, Location
 
@@ -87,6 +91,40 @@ class privateSpotApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_spots_paginated(self):
+        """Test paging through spots with a cursor"""
+        for i in range(3):
+            sample_spot(user=self.user)
+
+        res = self.client.get(SPOTS_URL, {'page_size': 2})
+
+        spots = Spot.objects.all().order_by('-id')
+        serializer = SpotSerializer(spots, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data[:2])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'], serializer.data[2:])
+        self.assertIsNone(res.data['next'])
+
+    def test_retrieve_spots_cursor_wrong_type(self):
+        """Test a cursor value that is not an id is rejected"""
+        cursor = base64.urlsafe_b64encode(b'["abc"]').decode()
+
+        res = self.client.get(SPOTS_URL, {'cursor': cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_spots_cursor_out_of_range(self):
+        """Test cursor values that are infinite or too large are rejected"""
+        for value in (b'[Infinity]', b'[1e400]', b'[NaN]', b'[99999999999]'):
+            cursor = base64.urlsafe_b64encode(value).decode()
+
+            res = self.client.get(SPOTS_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_spots_limited_to_user(self):
         """Test retrieving spots for user"""
         user2 = get_user_model().objects.create_user(
@@ -116,6 +154,112 @@ class privateSpotApiTests(TestCase):
         serializer = SpotDetailSerializer(spot)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_spots_query_count_fixed(self):
+        """Test listing spots runs a fixed number of queries"""
+        tag = sample_tag(user=self.user)
+        location = sample_location(user=self.user)
+
+        def add_spots(count):
+            for i in range(count):
+                spot = sample_spot(user=self.user)
+                spot.tags.add(tag)
+                spot.locations.add(location)
+
+        add_spots(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(SPOTS_URL)
+
+        add_spots(8)
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(SPOTS_URL)
+
+        self.assertEqual(len(res.data), 10)
+        self.assertEqual(len(few), len(many))
+
+    def test_view_spot_detail_query_count(self):
+        """Test the spot detail prefetches tags and locations"""
+        spot = sample_spot(user=self.user)
+        for name in ('Surf', 'Swim', 'Sail'):
+            spot.tags.add(sample_tag(user=self.user, name=name))
+            spot.locations.add(sample_location(user=self.user, name=name))
+
+        # The updated_at lookup, the spot and one query per relation
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(spot.id))
+
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(len(res.data['locations']), 3)
+
+    def test_view_spot_detail_not_modified(self):
+        """Test an unchanged spot answers If-None-Match with a 304"""
+        spot = sample_spot(user=self.user)
+        spot.tags.add(sample_tag(user=self.user))
+        etag = self.client.get(detail_url(spot.id))['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(detail_url(spot.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_view_spot_detail_modified(self):
+        """Test relation changes and renames change the spot ETag"""
+        spot = sample_spot(user=self.user)
+        tag = sample_tag(user=self.user)
+        etags = {self.client.get(detail_url(spot.id))['ETag']}
+
+        spot.tags.add(tag)
+        etags.add(self.client.get(detail_url(spot.id))['ETag'])
+        tag.name = 'Renamed'
+        tag.save()
+        res = self.client.get(
+            detail_url(spot.id), HTTP_IF_NONE_MATCH=', '.join(etags)
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Renamed')
+        self.assertNotIn(res['ETag'], etags)
+
+    def test_filter_spots_match_any_unique(self):
+        """Test spots matching several requested tags are returned once"""
+        spot = sample_spot(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Dance')
+        tag2 = sample_tag(user=self.user, name='Music')
+        spot.tags.add(tag1, tag2)
+
+        res = self.client.get(SPOTS_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_filter_spots_match_all(self):
+        """Test returning spots holding every requested tag"""
+        spot1 = sample_spot(user=self.user, name='Dance Club')
+        spot2 = sample_spot(user=self.user, name='Concert Hall')
+        tag1 = sample_tag(user=self.user, name='Dance')
+        tag2 = sample_tag(user=self.user, name='Music')
+        location = sample_location(user=self.user)
+        spot1.tags.add(tag1, tag2)
+        spot1.locations.add(location)
+        spot2.tags.add(tag2)
+        spot2.locations.add(location)
+
+        res = self.client.get(SPOTS_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'locations': f'{location.id}',
+            'match': 'all',
+        })
+
+        self.assertEqual(res.data, [SpotSerializer(spot1).data])
+
+    def test_filter_spots_invalid_params(self):
+        """Test invalid filter parameters are rejected"""
+        too_many = ','.join(str(i) for i in range(1000))
+        for params in ({'tags': 'a,b'}, {'locations': too_many},
+                       {'tags': '1', 'match': 'some'}):
+            res = self.client.get(SPOTS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_basic_spot(self):
         """Test creating spot"""
         payload = {
@@ -168,6 +312,60 @@ class privateSpotApiTests(TestCase):
         self.assertIn(location1, locations)
         self.assertIn(location2, locations)
 
+    def test_create_spot_validates_ids_in_one_query(self):
+        """Test tag and location ids are resolved with a query each"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(5)]
+        locations = [
+            sample_location(user=self.user, name=f'Location {i}')
+            for i in range(5)
+        ]
+        request = Request(APIRequestFactory().post(SPOTS_URL))
+        request.user = self.user
+        serializer = SpotSerializer(data={
+            'name': 'Island hopping',
+            'tags': [tag.id for tag in tags],
+            'locations': [location.id for location in locations],
+            'time_minutes': 60,
+            'price': 20.00
+        }, context={'request': request})
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+    def test_create_spot_with_other_users_tags(self):
+        """Test tags of other users are rejected, listing every one"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com',
+            'password123'
+        )
+        own = sample_tag(user=self.user)
+        foreign = [sample_tag(user=other, name=name) for name in ('A', 'B')]
+        payload = {
+            'name': 'Trespassing',
+            'tags': [own.id] + [tag.id for tag in foreign],
+            'time_minutes': 5,
+            'price': 1.00
+        }
+        res = self.client.post(SPOTS_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        for tag in foreign:
+            self.assertIn(f'"{tag.id}"', res.data['tags'][0])
+        self.assertFalse(Spot.objects.exists())
+
+    def test_create_spot_with_non_decimal_tag(self):
+        """Test ids that are digits but not decimal are rejected"""
+        payload = {
+            'name': 'Squared',
+            'tags': ['\u00b2'],
+            'time_minutes': 5,
+            'price': 1.00
+        }
+        res = self.client.post(SPOTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
     def test_partial_update_spot(self):
         """Test updating a spot with patch"""
         spot = sample_spot(user=self.user)
@@ -203,6 +401,45 @@ class privateSpotApiTests(TestCase):
         tags = spot.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def test_partial_update_spot_diffs_tags(self):
+        """Test a tag change inserts and deletes only the changed rows"""
+        spot = sample_spot(user=self.user)
+        kept, dropped, added = [
+            sample_tag(user=self.user, name=name)
+            for name in ('Kept', 'Dropped', 'Added')
+        ]
+        spot.tags.add(kept, dropped)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(
+                detail_url(spot.id), {'tags': [kept.id, added.id]}
+            )
+
+        writes = [
+            query['sql'] for query in queries
+            if 'core_spot_tags' in query['sql'] and
+            query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(set(spot.tags.all()), {kept, added})
+
+    def test_partial_update_spot_unchanged(self):
+        """Test a PATCH that changes nothing writes nothing"""
+        spot = sample_spot(user=self.user)
+        tag = sample_tag(user=self.user)
+        spot.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                detail_url(spot.id), {'name': spot.name, 'tags': [tag.id]}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse([
+            query for query in queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ])
+
 
 class SpotImageUploadTests(TestCase):
 
@@ -228,9 +465,13 @@ class SpotImageUploadTests(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.spot.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Spot.IMAGE_PENDING)
         self.assertTrue(os.path.exists(self.spot.image.path))
+        # Not published before its metadata is stripped
+        self.assertIsNone(res.data['image'])
+        self.assertTrue(self.spot.image.name.startswith('private/'))
 
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
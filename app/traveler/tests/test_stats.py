@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from graphene.test import Client
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app.schema import schema
+from core.models import Spot, Tag
+
+from traveler.stats import percentile
+
+
+STATS_URL = reverse('traveler:spot-stats')
+
+
+class PercentileTests(TestCase):
+    """Test the percentile fallback"""
+
+    def test_percentile_interpolates(self):
+        """Test percentiles interpolate like PERCENTILE_CONT"""
+        values = [10.0, 20.0, 30.0, 40.0]
+
+        self.assertEqual(percentile(values, 0.5), 25.0)
+        self.assertEqual(percentile(values, 0.0), 10.0)
+        self.assertEqual(percentile(values, 1.0), 40.0)
+        self.assertEqual(percentile([7.0], 0.9), 7.0)
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class SpotStatsApiTests(TestCase):
+    """Test spot statistics"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.cheap = Tag.objects.create(user=self.user, name='Cheap')
+        self.fancy = Tag.objects.create(user=self.user, name='Fancy')
+        for price, tag in ((5, self.cheap), (10, self.cheap),
+                           (15, self.cheap), (50, self.fancy)):
+            spot = Spot.objects.create(
+                user=self.user, name='Spot', time_minutes=price * 2,
+                price=price
+            )
+            spot.tags.add(tag)
+
+    def test_stats(self):
+        """Test statistics of all the user's spots"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'password123'
+        )
+        Spot.objects.create(user=other, name='Other', time_minutes=5,
+                            price=900)
+
+        res = self.client.get(STATS_URL, {'field': 'price', 'buckets': 3})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats, = res.data['groups']
+        self.assertEqual(stats['count'], 4)
+        self.assertEqual(stats['avg'], 20.0)
+        self.assertEqual((stats['min'], stats['max']), (5.0, 50.0))
+        self.assertEqual(stats['percentiles'][1],
+                         {'percentile': 0.5, 'value': 12.5})
+        self.assertEqual(
+            [bucket['count'] for bucket in stats['histogram']], [3, 0, 1]
+        )
+        self.assertEqual(stats['histogram'][2]['upper'], 50.0)
+
+    def test_stats_by_tag(self):
+        """Test statistics grouped by tag share histogram buckets"""
+        res = self.client.get(STATS_URL, {
+            'field': 'time_minutes', 'group_by': 'tag', 'buckets': 2
+        })
+
+        cheap, fancy = res.data['groups']
+        self.assertEqual((cheap['id'], cheap['name']),
+                         (self.cheap.id, 'Cheap'))
+        self.assertEqual(cheap['count'], 3)
+        self.assertEqual(cheap['avg'], 20.0)
+        self.assertEqual(cheap['percentiles'][3]['value'], 28.0)
+        self.assertEqual(
+            [bucket['count'] for bucket in cheap['histogram']], [3, 0]
+        )
+        self.assertEqual(
+            [bucket['count'] for bucket in fancy['histogram']], [0, 1]
+        )
+
+    def test_stats_cached_until_change(self):
+        """Test statistics are cached until the user's spots change"""
+        self.client.get(STATS_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(STATS_URL)
+
+        Spot.objects.create(user=self.user, name='New', time_minutes=1,
+                            price=1)
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['groups'][0]['count'], 5)
+
+    def test_stats_invalid_params(self):
+        """Test unknown fields, groups and bucket counts are rejected"""
+        for params in ({'field': 'name'}, {'group_by': 'user'},
+                       {'buckets': 0}, {'buckets': 'x'}):
+            res = self.client.get(STATS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_graphql(self):
+        """Test the spotStats GraphQL field"""
+        request = RequestFactory().get('/graphql/')
+        request.user = self.user
+
+        result = Client(schema).execute(
+            '''{
+                spotStats(field: PRICE, groupBy: TAG) {
+                    groupBy
+                    groups { name count max percentiles { value } }
+                }
+            }''',
+            context_value=request
+        )
+
+        stats = result['data']['spotStats']
+        self.assertEqual(stats['groupBy'], 'tag')
+        self.assertEqual(stats['groups'][1]['name'], 'Fancy')
+        self.assertEqual(stats['groups'][1]['max'], 50.0)
+        self.assertEqual(stats['groups'][0]['percentiles'][1]['value'], 10.0)
@@ -1,3 +1,6 @@
+import base64
+import json
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -50,6 +53,42 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_tags_paginated(self):
+        """Test paging through tags with a cursor"""
+        Tag.objects.create(user=self.user, name='Social')
+        Tag.objects.create(user=self.user, name='Dance')
+        Tag.objects.create(user=self.user, name='Dance')
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+
+        tags = Tag.objects.all().order_by('-name', '-id')
+        serializer = TagSerializer(tags, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data[:2])
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'], serializer.data[2:])
+        self.assertIsNone(res.data['next'])
+
+    def test_retrieve_tags_invalid_cursor(self):
+        """Test that an invalid cursor is rejected"""
+        res = self.client.get(TAGS_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_tags_cursor_not_scalar(self):
+        """Test that cursors holding objects or booleans are rejected"""
+        for position in ([{'a': 1}, 1], [['a'], 1], [True, 1]):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(position).encode()
+            ).decode()
+
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
         user2 = get_user_model().objects.create_user(
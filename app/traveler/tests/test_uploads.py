@@ -0,0 +1,122 @@
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.test import TestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Spot
+from core.storage import is_private_name
+
+from traveler.uploads import ImageUploadError, ImageUploadHandler, \
+    upload_directory
+
+
+def png_file(size=(10, 10), name='image.png'):
+    """Return an uploadable PNG image of incompressible noise"""
+    content = BytesIO()
+    noise = os.urandom(size[0] * size[1] * 3)
+    Image.frombytes('RGB', size, noise).save(content, format='PNG')
+
+    return SimpleUploadedFile(name, content.getvalue(), 'image/png')
+
+
+class ImageUploadHandlerTests(TestCase):
+    """Test streaming image uploads with limits"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@gmail.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.spot = Spot.objects.create(
+            user=self.user, name='Cliffs', time_minutes=5, price=5.00
+        )
+        self.url = reverse('traveler:spot-upload-image', args=[self.spot.id])
+
+    def tearDown(self):
+        self.spot.refresh_from_db()
+        self.spot.image.delete()
+
+    def receive(self, handler, data, chunk_size=1024):
+        handler.new_file('image', 'image.png', 'image/png', len(data))
+        for start in range(0, len(data), chunk_size):
+            handler.receive_data_chunk(data[start:start + chunk_size], start)
+
+        return handler.file_complete(len(data))
+
+    def test_spooled_next_to_storage(self):
+        """Test uploads are written where they are stored, and not served"""
+        data = png_file().read()
+
+        uploaded = self.receive(ImageUploadHandler(), data)
+
+        self.assertEqual(
+            os.path.dirname(uploaded.temporary_file_path()),
+            upload_directory()
+        )
+        self.assertTrue(is_private_name(os.path.relpath(
+            uploaded.temporary_file_path(), settings.MEDIA_ROOT
+        )))
+        self.assertEqual(uploaded.read(), data)
+        uploaded.close()
+
+    def test_rejected_while_reading(self):
+        """Test an oversized upload is rejected before it is read fully"""
+        handler = ImageUploadHandler()
+        handler.max_bytes = 2048
+        data = png_file().read() + bytes(4096)
+        handler.new_file('image', 'image.png', 'image/png', len(data))
+        handler.receive_data_chunk(data[:1024], 0)
+        handler.receive_data_chunk(data[1024:2048], 1024)
+
+        with self.assertRaises(ImageUploadError):
+            handler.receive_data_chunk(data[2048:3072], 2048)
+
+    @override_settings(SPOT_IMAGE_MAX_BYTES=1024)
+    def test_upload_too_many_bytes(self):
+        """Test uploading an image over the byte limit"""
+        res = self.client.post(
+            self.url, {'image': png_file(size=(200, 200))},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SPOT_IMAGE_MAX_PIXELS=100)
+    def test_upload_too_many_pixels(self):
+        """Test uploading an image over the pixel limit"""
+        res = self.client.post(
+            self.url, {'image': png_file(size=(20, 20))}, format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('100 pixels', res.data['detail'])
+
+    def test_upload_not_an_image(self):
+        """Test uploading a file that is not an image"""
+        text = SimpleUploadedFile('notes.png', b'plain text', 'image/png')
+
+        res = self.client.post(self.url, {'image': text}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_uploads_not_restricted(self):
+        """Test multipart requests to other endpoints accept any file"""
+        text = SimpleUploadedFile('notes.txt', b'plain text', 'text/plain')
+
+        res = self.client.post(reverse('traveler:spot-list'), {
+            'name': 'Notes', 'time_minutes': 5, 'price': 5.00,
+            'attachment': text
+        }, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, \
+    UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from PIL import Image
+
+from core.models import Spot, spot_upload_file_path
+
+
+class ImageUploadError(MultiPartParserError):
+    """Raised while reading an upload that is not an acceptable image"""
+
+
+class SpooledUploadedFile(TemporaryUploadedFile):
+    """Uploaded file spooled to a temporary file in a given directory"""
+
+    def __init__(self, directory, name, content_type, size, charset,
+                 content_type_extra=None):
+        ext = os.path.splitext(name)[1]
+        file = tempfile.NamedTemporaryFile(
+            suffix='.upload' + ext, dir=directory
+        )
+        UploadedFile.__init__(
+            self, file, name, content_type, size, charset, content_type_extra
+        )
+
+
+def upload_directory():
+    """Return the private directory uploads are stored in, if on local disk
+
+    Spooling there makes storing the upload a rename instead of a copy,
+    and partial uploads are never served.
+    """
+    storage = Spot._meta.get_field('image').storage
+    try:
+        directory = storage.path(
+            os.path.dirname(spot_upload_file_path(None, 'upload'))
+        )
+    except NotImplementedError:
+        return settings.FILE_UPLOAD_TEMP_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    return directory
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Stream image uploads to disk, enforcing size limits while reading
+
+    Installed by the upload_image action only. Uploads are never held in
+    memory beyond one chunk and the image header. The header is parsed as
+    soon as it has arrived, without decoding any pixels, and uploads over
+    SPOT_IMAGE_MAX_BYTES or SPOT_IMAGE_MAX_PIXELS, or that are not images,
+    are rejected at once. The SHA-256 of the upload is computed as it is
+    read.
+    """
+    max_header_bytes = 256 * 1024
+    # MPO is how Pillow reads the JPEGs many phone cameras write
+    formats = ('JPEG', 'MPO', 'PNG', 'GIF', 'WEBP')
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.SPOT_IMAGE_MAX_BYTES
+        self.max_pixels = settings.SPOT_IMAGE_MAX_PIXELS
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = SpooledUploadedFile(
+            upload_directory(), self.file_name, self.content_type, 0,
+            self.charset, self.content_type_extra
+        )
+        self.header = b''
+        self.header_checked = False
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self.reject(f'Images may be at most {self.max_bytes} bytes.')
+        if not self.header_checked:
+            self.header += raw_data
+            self.check_header(complete=False)
+        self.file.write(raw_data)
+        self.digest.update(raw_data)
+
+    def file_complete(self, file_size):
+        if not self.header_checked:
+            self.check_header(complete=True)
+        self.file.seek(0)
+        self.file.size = file_size
+        # Lets content addressed storage skip hashing the file again
+        self.file.sha256 = self.digest.hexdigest()
+
+        return self.file
+
+    def check_header(self, complete):
+        """Check the format and dimensions once the header can be read"""
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                image_format, (width, height) = image.format, image.size
+        except Image.DecompressionBombError:
+            self.reject_pixels()
+        except (IOError, SyntaxError, ValueError):
+            if complete or len(self.header) >= self.max_header_bytes:
+                self.reject('Upload a valid image.')
+            return
+
+        if image_format not in self.formats:
+            self.reject(f'Images must be one of {", ".join(self.formats)}.')
+        if width * height > self.max_pixels:
+            self.reject_pixels()
+        self.header = b''
+        self.header_checked = True
+
+    def reject_pixels(self):
+        self.reject(f'Images may be at most {self.max_pixels} pixels.')
+
+    def reject(self, message):
+        self.file.close()
+        raise ImageUploadError(message)
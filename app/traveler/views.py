@@ -1,17 +1,101 @@
-from graphene_django.views import GraphQLView
+import json
+
+from django.http import HttpResponseBadRequest
+from graphene_django.views import GraphQLView, HttpError
+from graphql import GraphQLError
+from graphql.execution import ExecutionResult
 from rest_framework.decorators import action, authentication_classes, \
     permission_classes, api_view
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
+from core.conditional import conditional_response
 from core.models import Tag, Location, Spot
 
+from user.authentication import CachedTokenAuthentication
+
 from traveler import serializers
+from traveler import filters
+from traveler import search
+from traveler import stats
+from traveler.autocomplete import autocomplete_indexes
+from traveler.bulk import BulkModelMixin
+from traveler.cache import CachedListMixin
+from traveler.documents import CachedDocumentBackend, query_hash
+from traveler.geo import NearbyLocationsMixin, NearbySpotsMixin
+from traveler.images import schedule_spot_image
+from traveler.pagination import KeysetPagination
+from traveler.uploads import ImageUploadHandler
+
+
+document_backend = CachedDocumentBackend()
+
+
+class PersistedQueryGraphQLView(GraphQLView):
+    """GraphQL view caching parsed documents and serving persisted queries
+
+    Clients may send `extensions.persistedQuery.sha256Hash` in place of the
+    query. Unknown hashes answer PersistedQueryNotFound and the client
+    registers the query by sending it once along with its hash.
+    """
+    extensions = None
+
+    def get_backend(self, request):
+        return document_backend
+
+    def json_encode(self, request, d, pretty=False):
+        if self.extensions:
+            d['extensions'] = self.extensions
+
+        return super().json_encode(request, d, pretty)
+
+    def get_persisted_hash(self, request, data):
+        """Return the persisted query hash sent with the request"""
+        extensions = request.GET.get('extensions') or data.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(
+                    HttpResponseBadRequest('Extensions are invalid JSON.')
+                )
+        if not isinstance(extensions, dict):
+            return None
+        persisted_query = extensions.get('persistedQuery')
+        if not isinstance(persisted_query, dict):
+            return None
+
+        return persisted_query.get('sha256Hash')
+
+    def execute_graphql_request(self, request, data, query, variables,
+                                operation_name, show_graphiql=False):
+        persisted_hash = self.get_persisted_hash(request, data)
+        if persisted_hash and not query:
+            document = self.get_backend(request).get_document(
+                self.schema, persisted_hash
+            )
+            if document is None:
+                return ExecutionResult(
+                    errors=[GraphQLError('PersistedQueryNotFound')]
+                )
+            query = document.document_string
+        elif persisted_hash and query_hash(query) != persisted_hash:
+            return ExecutionResult(
+                errors=[GraphQLError('sha256Hash does not match the query')],
+                invalid=True
+            )
+
+        result = super().execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        self.extensions = getattr(result, 'extensions', None)
+
+        return result
 
 
-class DRFAuthenticatedGraphQLView(GraphQLView):
+class DRFAuthenticatedGraphQLView(PersistedQueryGraphQLView):
     # custom view for using DRF TokenAuthentication with graphene
     # GraphQL.as_view() all requests to Graphql endpoint will require token
     # for auth, obtained from DRF endpoint
@@ -20,17 +104,23 @@ class DRFAuthenticatedGraphQLView(GraphQLView):
     def as_view(cls, *args, **kwargs):
         view = super(DRFAuthenticatedGraphQLView, cls).as_view(*args, **kwargs)
         view = permission_classes((IsAuthenticated,))(view)
-        view = authentication_classes((TokenAuthentication,))(view)
+        view = authentication_classes((CachedTokenAuthentication,))(view)
         view = api_view(['POST'])(view)
         return view
 
 
-class BaseSpotAttrViewSet(viewsets.GenericViewSet,
+class BaseSpotAttrViewSet(BulkModelMixin,
+                          CachedListMixin,
+                          viewsets.GenericViewSet,
                           mixins.ListModelMixin,
                           mixins.CreateModelMixin):
     """Base viewset for user owner spot attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    ordering = ('-name', '-id')
+    cache_query_params = ('assigned_only', 'cursor', 'page_size')
+    max_autocomplete_limit = 50
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
@@ -39,53 +129,136 @@ class BaseSpotAttrViewSet(viewsets.GenericViewSet,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(spot__isnull=False)
+            queryset = filters.filter_assigned(queryset, self.spot_relation)
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*self.ordering)
 
     def perform_create(self, serializer):
         """Create a new Spot Attr"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the names with a word starting with the `q` prefix"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+        limit = max(1, min(limit, self.max_autocomplete_limit))
+
+        index = autocomplete_indexes.get(self.queryset.model, request.user)
+
+        return Response([
+            {'id': pk, 'name': name}
+            for pk, name in index.complete(
+                request.query_params.get('q', ''), limit
+            )
+        ])
+
 
 class TagViewSet(BaseSpotAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    spot_relation = 'tags'
 
 
-class LocationViewSet(BaseSpotAttrViewSet):
+class LocationViewSet(NearbyLocationsMixin, BaseSpotAttrViewSet):
     """Manage locations in the database"""
     queryset = Location.objects.all()
     serializer_class = serializers.LocationSerializer
+    spot_relation = 'locations'
+    cache_query_params = BaseSpotAttrViewSet.cache_query_params + (
+        'near', 'radius'
+    )
 
+    def get_queryset(self):
+        """Return the user's locations, near a point if one is given"""
+        return self.filter_near(super().get_queryset())
 
-class SpotViewSet(viewsets.ModelViewSet):
+
+class SpotViewSet(BulkModelMixin, CachedListMixin, NearbySpotsMixin,
+                  viewsets.ModelViewSet):
     """Manage Spots in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Spot.objects.all()
     serializer_class = serializers.SpotSerializer
+    pagination_class = KeysetPagination
+    ordering = ('-id',)
+    search_ordering = ('-rank', '-id')
+    max_filter_ids = 100
+    max_search_length = 200
+    cache_query_params = (
+        'tags', 'locations', 'match', 'search', 'near', 'radius', 'cursor',
+        'page_size'
+    )
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, name):
         """Convert a  list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        str_ids = self.request.query_params.get(name)
+        if not str_ids:
+            return []
+        str_ids = str_ids.split(',')
+        if len(str_ids) > self.max_filter_ids:
+            raise ValidationError({
+                name: f'At most {self.max_filter_ids} ids can be given.'
+            })
+        try:
+            return [int(str_id) for str_id in str_ids]
+        except ValueError:
+            raise ValidationError({name: 'Expected a list of integer ids.'})
 
     def get_queryset(self):
         """Retrieve the spots for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        locations = self.request.query_params.get('locations')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if locations:
-            location_ids = self._params_to_ints(locations)
-            queryset = queryset.filter(locations__id__in=location_ids)
+        match = self.request.query_params.get('match', filters.MATCH_ANY)
+        if match not in filters.MATCH_CHOICES:
+            raise ValidationError({
+                'match': f'Expected one of {", ".join(filters.MATCH_CHOICES)}.'
+            })
+        queryset = filters.filter_spots(
+            self.queryset,
+            tags=self._params_to_ints('tags'),
+            locations=self._params_to_ints('locations'),
+            match=match
+        )
+        queryset = self.filter_near(queryset.filter(user=self.request.user))
+        text = self.request.query_params.get('search', '').strip()
+        if len(text) > self.max_search_length:
+            raise ValidationError({
+                'search': f'At most {self.max_search_length} characters '
+                          f'can be given.'
+            })
+        if text:
+            queryset = search.search_spots(queryset, self.request.user, text)
+            self.ordering = self.search_ordering
+        queryset = queryset.order_by(*self.ordering)
+
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
 
-        return queryset.filter(user=self.request.user)
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a spot, or a 304 if the client's copy is current"""
+        try:
+            updated_at = Spot.objects.filter(
+                user=request.user, pk=kwargs['pk']
+            ).values_list('updated_at', flat=True).first()
+        except (TypeError, ValueError):
+            updated_at = None
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        return conditional_response(
+            request, f'spot:{kwargs["pk"]}', updated_at,
+            lambda: super(SpotViewSet, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -100,9 +273,40 @@ class SpotViewSet(viewsets.ModelViewSet):
         """Create a new spot"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['GET'], detail=False, url_path='stats',
+            url_name='stats')
+    def spot_stats(self, request):
+        """Return statistics of a spot field, optionally by tag or location"""
+        params = request.query_params
+        field = params.get('field', 'price')
+        if field not in stats.STAT_FIELDS:
+            raise ValidationError({
+                'field': f'Expected one of {", ".join(stats.STAT_FIELDS)}.'
+            })
+        group_by = params.get('group_by') or None
+        if group_by is not None and group_by not in stats.GROUP_RELATIONS:
+            raise ValidationError({
+                'group_by': 'Expected one of '
+                            f'{", ".join(stats.GROUP_RELATIONS)}.'
+            })
+        try:
+            buckets = int(params.get('buckets', stats.DEFAULT_BUCKETS))
+        except ValueError:
+            raise ValidationError({'buckets': 'Expected an integer.'})
+        if not 1 <= buckets <= stats.MAX_BUCKETS:
+            raise ValidationError({
+                'buckets': f'Expected 1 to {stats.MAX_BUCKETS} buckets.'
+            })
+
+        return Response(
+            stats.spot_stats(request.user, field, group_by, buckets)
+        )
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to a spot"""
+        """Upload an image to a spot, processed after the response"""
+        # Set before request.data parses the upload
+        request.upload_handlers = [ImageUploadHandler(request)]
         spot = self.get_object()
         serializer = self.get_serializer(
             spot,
@@ -110,10 +314,11 @@ class SpotViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            spot = serializer.save(image_status=Spot.IMAGE_PENDING)
+            schedule_spot_image(spot)
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
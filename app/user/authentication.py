@@ -0,0 +1,143 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from core.caches import is_shared_cache
+from core.lru import LRUCache
+
+
+class TokenUserCache:
+    """Cache of token key to user, in process and optionally shared
+
+    Only the `user_fields` authentication needs are cached, never the
+    password hash, and users are rebuilt from them with the other fields
+    deferred. The in-process LRU answers without any I/O. When a Django
+    cache alias is configured each entry is stamped with a generation also
+    stored there, read before the user was looked up, and entries are only
+    used while it matches. Tokens without a generation get one once they
+    resolved to a user, so unknown tokens write nothing to the cache.
+    Evictions replace the generation, so they take effect in all workers
+    at once, and an entry stored from a lookup that raced an eviction is
+    never used. Local misses are answered from the
+    shared cache, so a token looked up by one worker is warm for all.
+    Nothing is cached when the alias is not shared by all processes.
+    """
+    key_prefix = 'user:token:'
+    generation_prefix = 'user:token-generation:'
+    user_fields = (
+        'id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser',
+        'updated_at',
+    )
+
+    def __init__(self, max_size, ttl, alias=None):
+        self.ttl = ttl
+        self.alias = alias
+        self.local = LRUCache(max_size, ttl)
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    @property
+    def enabled(self):
+        return self.alias is None or is_shared_cache(self.alias)
+
+    @property
+    def field_names(self):
+        # In model order, as from_db() expects
+        return [
+            field.attname for field in get_user_model()._meta.concrete_fields
+            if field.attname in self.user_fields
+        ]
+
+    def get(self, key):
+        """Return the cached user of a token, if any"""
+        if not self.enabled:
+            return None
+        entry = self.local.get(key)
+        shared = self.shared
+        if shared is not None:
+            generation = shared.get(self.generation_prefix + key)
+            if entry is None or entry[0] != generation:
+                entry = None
+                if generation is not None:
+                    entry = shared.get(self.key_prefix + key)
+                if entry is None or entry[0] != generation:
+                    self.local.delete(key)
+                    return None
+                self.local.set(key, entry)
+        if entry is None:
+            return None
+
+        # A new instance each time, requests must not share one
+        return get_user_model().from_db(None, self.field_names, entry[1])
+
+    def generation(self, key):
+        """Return the generation to stamp a user looked up after the call"""
+        shared = self.shared
+        if shared is None:
+            return None
+
+        return shared.get(self.generation_prefix + key)
+
+    def set(self, key, user, generation):
+        """Cache a user looked up after generation() returned generation"""
+        if not self.enabled:
+            return
+        shared = self.shared
+        if shared is not None and generation is None:
+            # Any generation stored meanwhile comes from an eviction
+            generation = uuid.uuid4().hex
+            if not shared.add(
+                self.generation_prefix + key, generation, self.ttl * 2
+            ):
+                return
+        entry = (
+            generation,
+            tuple(getattr(user, field) for field in self.field_names)
+        )
+        if shared is not None:
+            shared.set(self.key_prefix + key, entry, self.ttl)
+        self.local.set(key, entry)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None:
+            self.shared.set_many({
+                self.generation_prefix + key: uuid.uuid4().hex
+                for key in keys
+            }, self.ttl * 2)
+            self.shared.delete_many([self.key_prefix + key for key in keys])
+
+
+token_cache = TokenUserCache(
+    max_size=settings.TOKEN_AUTH_CACHE_SIZE,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL,
+    alias=settings.TOKEN_AUTH_CACHE_ALIAS
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token lookup on cache hits
+
+    Entries are evicted when a token is deleted or its user is saved, which
+    covers deactivation, and otherwise expire after TOKEN_AUTH_CACHE_TTL.
+    Evictions reach other processes through TOKEN_AUTH_CACHE_ALIAS. Cached
+    users are still checked to be active, in case a user was deactivated
+    without a save signal.
+    """
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is not None and user.is_active:
+            return (user, self.get_model()(key=key, user=user))
+
+        generation = token_cache.generation(key)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, generation)
+
+        return (user, token)
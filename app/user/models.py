@@ -1,10 +1,26 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
+from user.authentication import token_cache
+
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
         Token.objects.create(user=instance)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_user_tokens(sender, instance=None, created=False, **kwargs):
+    """Drop cached token lookups holding a stale copy of the user"""
+    if not created:
+        token_cache.delete(*Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance=None, **kwargs):
+    token_cache.delete(instance.key)
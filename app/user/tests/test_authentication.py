@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from user.authentication import CachedTokenAuthentication, \
+    TokenUserCache, token_cache
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating tokens through the cache"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='testpass',
+            name='name'
+        )
+        self.key = Token.objects.get(user=self.user).key
+        self.authentication = CachedTokenAuthentication()
+
+    def tearDown(self):
+        token_cache.delete(self.key)
+
+    def test_cached_token_skips_database(self):
+        """Test a cached token authenticates without queries"""
+        self.authentication.authenticate_credentials(self.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(
+                self.key
+            )
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.key)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token fails to authenticate"""
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials('invalid')
+
+    def test_invalid_token_not_cached(self):
+        """Test unknown tokens write nothing to the shared cache"""
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials('invalid')
+
+        self.assertIsNone(caches['default'].get(
+            token_cache.generation_prefix + 'invalid'
+        ))
+
+    def test_deleted_token_evicted(self):
+        """Test deleting a token evicts it from the cache"""
+        self.authentication.authenticate_credentials(self.key)
+        Token.objects.filter(key=self.key).delete()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_deactivated_user_evicted(self):
+        """Test deactivating a user evicts their tokens"""
+        self.authentication.authenticate_credentials(self.key)
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_cached_inactive_user_rejected(self):
+        """Test a user deactivated without a save signal is rejected"""
+        self.authentication.authenticate_credentials(self.key)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+        token_cache.delete(self.key)
+        token_cache.set(self.key, get_user_model().objects.get(
+            pk=self.user.pk
+        ), token_cache.generation(self.key))
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.key)
+
+    def test_eviction_reaches_other_processes(self):
+        """Test a token evicted by one process is not served by another"""
+        worker = TokenUserCache(max_size=10, ttl=60, alias='default')
+        other = TokenUserCache(max_size=10, ttl=60, alias='default')
+        worker.set(self.key, self.user, worker.generation(self.key))
+        self.assertEqual(other.get(self.key), self.user)
+
+        other.delete(self.key)
+
+        self.assertIsNone(worker.get(self.key))
+        self.assertEqual(len(worker.local), 0)
+
+    def test_stale_user_not_served_after_save(self):
+        """Test the user endpoint sees changes saved by another process"""
+        worker = TokenUserCache(max_size=10, ttl=60, alias='default')
+        worker.set(self.key, self.user, worker.generation(self.key))
+        get_user_model().objects.get(pk=self.user.pk).save()
+
+        self.assertIsNone(worker.get(self.key))
+
+    def test_lookup_racing_eviction_not_cached(self):
+        """Test a user read before an eviction is not served after it"""
+        worker = TokenUserCache(max_size=10, ttl=60, alias='default')
+        other = TokenUserCache(max_size=10, ttl=60, alias='default')
+        generation = worker.generation(self.key)
+
+        other.delete(self.key)
+        worker.set(self.key, self.user, generation)
+
+        self.assertIsNone(worker.get(self.key))
+        self.assertIsNone(other.get(self.key))
+
+    def test_password_hash_not_cached(self):
+        """Test only the fields authentication needs are cached"""
+        self.authentication.authenticate_credentials(self.key)
+
+        _, values = caches['default'].get(token_cache.key_prefix + self.key)
+        user = token_cache.get(self.key)
+
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(user.email, self.user.email)
+        self.assertIn('password', user.get_deferred_fields())
+
+    def test_cached_user_saves_only_loaded_fields(self):
+        """Test saving a cached user keeps the fields it was not given"""
+        self.authentication.authenticate_credentials(self.key)
+        user, _ = self.authentication.authenticate_credentials(self.key)
+
+        user.name = 'new name'
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'new name')
+        self.assertTrue(self.user.check_password('testpass'))
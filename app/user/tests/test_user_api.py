@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -5,6 +7,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.hashers import HashingPoolBusy
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -85,6 +89,15 @@ class PublicUserApiTests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @patch('core.hashers.hashing_pool.run', side_effect=HashingPoolBusy)
+    def test_create_token_hashing_saturated(self, run):
+        """Test that logins are throttled when the hashing pool is full"""
+        payload = {'email': 'test@gmail.com', 'password': 'testpass'}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertNotIn('token', res.data)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
     def test_create_token_missing_field(self):
         """Test that email and password are required"""
         res = self.client.post(TOKEN_URL, {'email': 'one', 'password': ''})
@@ -121,6 +134,27 @@ class PrivateUserApiTests(TestCase):
             'email': self.user.email
         })
 
+    def test_retrieve_profile_not_modified(self):
+        """Test an unchanged profile answers If-None-Match with a 304"""
+        etag = self.client.get(ME_URL)['ETag']
+
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.user.name = 'new name'
+        self.user.save()
+        res = self.client.get(ME_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_retrieve_profile_not_modified_since(self):
+        """Test If-Modified-Since is honored for the profile"""
+        last_modified = self.client.get(ME_URL)['Last-Modified']
+
+        res = self.client.get(ME_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_post_me_not_allowed(self):
         """Test that POST is not allowed on the me url"""
         res = self.client.post(ME_URL, {})
@@ -137,3 +171,14 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @patch('core.hashers.hashing_pool.run', side_effect=HashingPoolBusy)
+    def test_update_password_hashing_saturated(self, run):
+        """Test password changes are throttled when the hashing pool is full"""
+        res = self.client.patch(
+            ME_URL, {'name': 'new name', 'password': 'newpass'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.name, 'new name')
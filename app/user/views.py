@@ -1,9 +1,12 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.settings import api_settings
 
+from core.conditional import conditional_response
+
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -32,9 +35,18 @@ class CustomObtainAuthToken(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authentication user"""
         return self.request.user
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return the user, or a 304 if the client's copy is current"""
+        return conditional_response(
+            request, f'user:{request.user.pk}', request.user.updated_at,
+            lambda: super(ManageUserView, self).retrieve(
+                request, *args, **kwargs
+            )
+        )